@@ -1,6 +1,7 @@
 from exceptions import BlockLimitException
 from random import Random
 from board import Shape
+from evaluator import PlacementEvaluator
 
 
 class Adversary:
@@ -24,3 +25,53 @@ class RandomAdversary(Adversary):
                 self.blocks -= 1
 
         return self.random.choice(list(Shape))
+
+
+class WorstCaseAdversary(Adversary):
+    """
+    Picks the shape whose best placement on the current stack is worst for
+    the player, according to a fast one-ply evaluation. A shape that cannot
+    be placed at all is always chosen. Ties are broken randomly.
+
+    The evaluation is a proxy for the player's: PlacementEvaluator scores
+    hard drops with the fixed weights of the article MyPlayer is based on,
+    not with MyPlayer's own (danger-dependent, two-ply) search, so the shape
+    picked is the worst for that evaluation rather than for MyPlayer. A
+    choice takes about 0.6-0.8ms on a 10x24 board.
+    """
+
+    random = None
+    blocks = None
+    evaluator = None
+
+    def __init__(self, seed, blocks=None):
+        self.random = Random(seed)
+        self.blocks = blocks
+
+    def choose_block(self, board):
+        if self.blocks is not None:
+            if self.blocks == 0:
+                raise BlockLimitException()
+            else:
+                self.blocks -= 1
+
+        evaluator = self.evaluator
+        if evaluator is None or evaluator.width != board.width:
+            evaluator = PlacementEvaluator(board.width, board.height)
+            self.evaluator = evaluator
+
+        replies = evaluator.best_replies(board)
+        hopeless = [shape for shape, score in replies.items() if score is None]
+        if hopeless:
+            return self.random.choice(hopeless)
+
+        worst = min(replies.values())
+        return self.random.choice(
+            [shape for shape, score in replies.items() if score == worst]
+        )
+
+
+adversaries = {
+    'random': RandomAdversary,
+    'worst': WorstCaseAdversary,
+}
@@ -1,5 +1,28 @@
 import argparse
 
+from constants import RENDER_FPS
+from ringlog import LEVELS
+
+
+def milliseconds(value):
+    """
+    Parses a number of milliseconds into seconds.
+    """
+
+    return float(value) / 1000
+
+
+def positive(value):
+    """
+    Parses a number that has to be greater than zero.
+    """
+
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f'{value} is not greater than zero')
+    return number
+
+
 parser = argparse.ArgumentParser(description='Play Tetris')
 parser.add_argument(
     '--manual',
@@ -8,3 +31,87 @@ parser.add_argument(
     action='store_true',
     help='Play manually'
 )
+parser.add_argument(
+    '--adversary',
+    '-a',
+    default='random',
+    choices=['random', 'worst'],
+    help='Adversary choosing the blocks'
+)
+parser.add_argument(
+    '--turbo',
+    '-t',
+    default=False,
+    action='store_true',
+    help='Run the game separately from rendering, dropping frames'
+)
+parser.add_argument(
+    '--rate',
+    default=0,
+    type=float,
+    help='Moves per second in turbo mode (0 for as fast as possible)'
+)
+parser.add_argument(
+    '--fps',
+    default=RENDER_FPS,
+    type=positive,
+    help='Frames per second drawn in turbo mode'
+)
+parser.add_argument(
+    '--persistent',
+    '-p',
+    default=False,
+    action='store_true',
+    help='Keep playing games on the same stream until it is closed'
+)
+parser.add_argument(
+    '--deadline',
+    default=None,
+    type=milliseconds,
+    help='Milliseconds the player may take per decision'
+)
+parser.add_argument(
+    '--workers',
+    default=None,
+    type=int,
+    help='Processes the player may spread its search over'
+)
+parser.add_argument(
+    '--tucks',
+    default=False,
+    action='store_true',
+    help='Also consider sliding blocks underneath overhangs'
+)
+parser.add_argument(
+    '--beam',
+    default=None,
+    type=int,
+    help='Reconsider the planned second placement among this many, once '
+         'the block after it is known'
+)
+parser.add_argument(
+    '--ponder',
+    default=False,
+    action='store_true',
+    help='Think ahead while waiting for the next block'
+)
+parser.add_argument(
+    '--log-level',
+    default='warning',
+    choices=sorted(LEVELS, key=LEVELS.get),
+    help='Keep log records of at least this level, written to stderr when '
+         'a game ends or on SIGUSR1'
+)
+
+
+def player_options(args):
+    """
+    Options from the command line to pass to the selected player.
+    """
+
+    return {
+        'deadline': args.deadline,
+        'workers': args.workers,
+        'tucks': args.tucks,
+        'beam': args.beam,
+    }
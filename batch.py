@@ -0,0 +1,565 @@
+from adversary import RandomAdversary, adversaries
+from board import Block, Board, Direction, Rotation, Shape
+from constants import BOARD_HEIGHT, BOARD_WIDTH, BLOCK_LIMIT
+from decision_cache import DecisionCache, surface_key
+from exceptions import BlockLimitException
+from player import MyPlayer
+from random import Random
+
+import argparse
+import time
+
+import numpy as np
+
+
+# Falling and next shapes are stored by their index in this list, which is
+# one less than their index in the color plane of board.Board.
+SHAPES = list(Shape)
+
+SCORES = np.array([0, 100, 400, 800, 1600])
+
+
+def placement_actions(rotation, move):
+    """
+    Translates a placement (a number of anticlockwise rotations followed by
+    a horizontal move, negative meaning left) into the actions a player
+    would make for it, ending with a drop.
+    """
+
+    actions = [Rotation.Anticlockwise] * rotation
+    if move < 0:
+        actions += [Direction.Left] * -move
+    else:
+        actions += [Direction.Right] * move
+    actions.append(Direction.Drop)
+    return actions
+
+
+class ProbeBoard(Board):
+    """
+    An empty board that remembers every cell it was asked about. A block
+    moved around on it ends up exactly where it would on any board that has
+    none of those cells occupied.
+    """
+
+    queried = None
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.queried = set()
+
+    def drop_distance(self, masks, x, y):
+        # Every row on the way down is asked about.
+        distance = 0
+        while (y + len(masks) + distance < self.height and
+               not self.overlaps(masks, x, y + distance + 1)):
+            distance += 1
+        return distance
+
+    def overlaps(self, masks, x, y):
+        for i, mask in enumerate(masks):
+            while mask:
+                low = mask & -mask
+                self.queried.add((x + low.bit_length() - 1, y + i))
+                mask ^= low
+        return False
+
+
+class Plan:
+    """
+    The trajectory of a placement on an empty board, up to (but excluding)
+    the final drop.
+    """
+
+    cells = None
+    score = None
+    landed = None
+    queried = None
+
+    def __init__(self, shape, rotation, move, width, height):
+        probe = ProbeBoard(width, height)
+        block = Block(shape)
+        block.initialize(probe)
+
+        # Mirror Board.move and Board.rotate, including the implicit move
+        # down, but leave the drop to the caller.
+        landed = False
+        for action in placement_actions(rotation, move)[:-1]:
+            if isinstance(action, Rotation):
+                block.rotate(action, probe)
+                landed = block.move(Direction.Down, probe)
+            else:
+                landed = (
+                    block.move(action, probe) or
+                    block.move(Direction.Down, probe)
+                )
+            if landed:
+                break
+
+        self.cells = sorted(block.cells)
+        self.score = probe.score
+        self.landed = landed
+        self.queried = {
+            (x, y) for (x, y) in probe.queried
+            if 0 <= x < width and 0 <= y < height
+        }
+
+
+class BatchEnvironment:
+    """
+    Plays many independent games in lockstep, one placement per game per
+    step. Boards are kept in a single (games, height, width) array holding
+    the same shape indices as the color plane of board.Board. Each game draws its
+    shapes from its own adversary, so seeded RandomAdversary streams give
+    the same games as board.Board would.
+
+    Placements whose path down from the spawn position does not touch the
+    stack are applied with array operations; the rest are handed to
+    board.Board itself, so results agree with it game for game.
+    """
+
+    width = None
+    height = None
+    size = None
+
+    adversaries = None
+    grid = None
+    score = None
+    lines = None
+    falling = None
+    next = None
+    done = None
+    won = None
+
+    def __init__(self, adversaries, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        self.width = width
+        self.height = height
+        self.size = len(adversaries)
+        self.adversaries = list(adversaries)
+
+        self.max_move = width - 1
+        self.moves = 2 * self.max_move + 1
+        self.prepare_plans()
+        self.reset()
+
+    @classmethod
+    def seeded(cls, seeds, blocks=BLOCK_LIMIT, adversary=RandomAdversary,
+               **kwargs):
+        """
+        Creates an environment with one adversary per seed.
+        """
+
+        return cls([adversary(seed, blocks) for seed in seeds], **kwargs)
+
+    def plan_index(self, shape, rotation, move):
+        return (shape * 4 + rotation) * self.moves + move + self.max_move
+
+    def prepare_plans(self):
+        """
+        Precomputes the trajectory of every placement of every shape, as well
+        as the cells every shape occupies when it spawns.
+        """
+
+        count = len(SHAPES) * 4 * self.moves
+        self.plan_cells_x = np.zeros((count, 4), dtype=np.intp)
+        self.plan_cells_y = np.zeros((count, 4), dtype=np.intp)
+        self.plan_score = np.zeros(count, dtype=np.int64)
+        self.plan_landed = np.zeros(count, dtype=bool)
+        self.plan_queried = np.zeros(
+            (count, self.height, self.width),
+            dtype=bool
+        )
+
+        for s, shape in enumerate(SHAPES):
+            for rotation in range(4):
+                for move in range(-self.max_move, self.max_move + 1):
+                    i = self.plan_index(s, rotation, move)
+                    plan = Plan(shape, rotation, move, self.width, self.height)
+                    self.plan_cells_x[i] = [x for (x, y) in plan.cells]
+                    self.plan_cells_y[i] = [y for (x, y) in plan.cells]
+                    self.plan_score[i] = plan.score
+                    self.plan_landed[i] = plan.landed
+                    for (x, y) in plan.queried:
+                        self.plan_queried[i, y, x] = True
+
+        self.spawn = np.zeros(
+            (len(SHAPES), self.height, self.width),
+            dtype=bool
+        )
+        probe = Board(self.width, self.height)
+        for s, shape in enumerate(SHAPES):
+            block = Block(shape)
+            block.initialize(probe)
+            for (x, y) in block:
+                self.spawn[s, y, x] = True
+
+    def choose(self, game):
+        """
+        Asks the adversary of a game for its next shape. Returns -1 and
+        marks the game as won once the adversary runs out of blocks.
+        """
+
+        adversary = self.adversaries[game]
+        try:
+            if isinstance(adversary, RandomAdversary):
+                # Random adversaries ignore the board; skip building one.
+                shape = adversary.choose_block(None)
+            else:
+                shape = adversary.choose_block(self.board(game))
+        except BlockLimitException:
+            self.done[game] = True
+            self.won[game] = True
+            return -1
+
+        return SHAPES.index(shape)
+
+    def reset(self):
+        """
+        Starts all games afresh, mirroring the start of Board.run.
+        """
+
+        self.grid = np.zeros((self.size, self.height, self.width), np.int8)
+        self.score = np.zeros(self.size, dtype=np.int64)
+        self.lines = np.zeros(self.size, dtype=np.int64)
+        self.falling = np.full(self.size, -1, dtype=np.intp)
+        self.next = np.full(self.size, -1, dtype=np.intp)
+        self.done = np.zeros(self.size, dtype=bool)
+        self.won = np.zeros(self.size, dtype=bool)
+
+        for game in range(self.size):
+            self.falling[game] = self.choose(game)
+            if not self.done[game]:
+                self.next[game] = self.choose(game)
+
+    def step(self, rotations, moves):
+        """
+        Makes one placement in every game that is still running. Rotations
+        are counts of anticlockwise rotations and moves are horizontal
+        shifts, negative meaning left. Returns the score and lines cleared
+        by this step, and which games are over.
+        """
+
+        rotations = np.asarray(rotations, dtype=np.intp) % 4
+        moves = np.clip(
+            np.asarray(moves, dtype=np.intp),
+            -self.max_move,
+            self.max_move
+        )
+
+        active = ~self.done
+        games = np.arange(self.size)
+        plan = self.plan_index(np.maximum(self.falling, 0), rotations, moves)
+
+        # A placement can be made with array operations if its path from the
+        # spawn position only touches empty cells.
+        occupied = self.grid != 0
+        blocked = (occupied & self.plan_queried[plan]).any(axis=(1, 2))
+        fast = active & ~blocked
+        slow = np.flatnonzero(active & blocked)
+
+        before = self.score.copy()
+        cleared = np.zeros(self.size, dtype=np.int64)
+
+        if fast.any():
+            cleared[fast] = self.place(games[fast], plan[fast])
+
+        for game in slow:
+            cleared[game] = self.place_slow(
+                game,
+                int(rotations[game]),
+                int(moves[game])
+            )
+
+        self.lines += cleared
+
+        # The next block starts falling and the adversaries pick a new one.
+        for game in np.flatnonzero(active):
+            self.falling[game] = self.next[game]
+            self.next[game] = self.choose(game)
+
+        # Games end when the new block overlaps the stack.
+        running = np.flatnonzero(active & ~self.won)
+        occupied = self.grid[running] != 0
+        overlap = (occupied & self.spawn[self.falling[running]]).any(
+            axis=(1, 2)
+        )
+        self.done[running[overlap]] = True
+
+        return self.score - before, cleared, self.done.copy()
+
+    def place(self, games, plan):
+        """
+        Drops the falling blocks of the given games along precomputed plans,
+        then clears full lines. Returns the number of lines cleared.
+        """
+
+        xs = self.plan_cells_x[plan]
+        ys = self.plan_cells_y[plan]
+        occupied = self.grid[games] != 0
+
+        # For every cell of the block, find the first occupied row below it.
+        columns = occupied[np.arange(len(games))[:, None], :, xs]
+        rows = np.arange(self.height)
+        below = columns & (rows[None, None, :] > ys[:, :, None])
+        floor = np.where(below.any(axis=2), below.argmax(axis=2), self.height)
+        drop = (floor - ys - 1).min(axis=1)
+        drop[self.plan_landed[plan]] = 0
+
+        ys = ys + drop[:, None]
+        self.grid[games[:, None], ys, xs] = (self.falling[games] + 1)[:, None]
+        self.score[games] += self.plan_score[plan] + drop
+
+        return self.clean(games)
+
+    def clean(self, games):
+        """
+        Removes full rows of the given games, with the same quirk as
+        Board.clean: the top row is only checked after something below it
+        was removed.
+        """
+
+        grid = self.grid[games]
+        full = (grid != 0).all(axis=2)
+        full[:, 0] &= full[:, 1:].any(axis=1)
+        removed = full.sum(axis=1)
+
+        clearing = np.flatnonzero(removed)
+        if len(clearing):
+            # Move kept rows to the bottom, preserving their order, and empty
+            # as many rows at the top as were removed.
+            order = np.argsort(~full[clearing], axis=1, kind='stable')
+            rows = np.take_along_axis(
+                grid[clearing],
+                order[:, :, None],
+                axis=1
+            )
+            top = np.arange(self.height)[None, :] < removed[clearing, None]
+            rows[top] = 0
+            grid[clearing] = rows
+            self.grid[games] = grid
+
+        self.score[games] += SCORES[removed]
+        return removed
+
+    def place_slow(self, game, rotation, move):
+        """
+        Makes a placement with board.Board itself, for placements that
+        interact with the stack on their way down.
+        """
+
+        board = self.board(game)
+        board.next = None
+
+        for action in placement_actions(rotation, move):
+            if isinstance(action, Rotation):
+                landed = board.rotate(action)
+            else:
+                landed = board.move(action)
+            if landed:
+                break
+
+        self.store(game, board)
+        return len(board.cleared or ())
+
+    def board(self, game):
+        """
+        Builds a board.Board equivalent to the given game.
+        """
+
+        board = Board(self.width, self.height, int(self.score[game]))
+        board.colors = bytearray(self.grid[game].tobytes())
+        board.cells = frozenset(
+            (int(x), int(y)) for y, x in zip(*np.nonzero(self.grid[game]))
+        )
+
+        if self.falling[game] >= 0:
+            board.falling = Block(SHAPES[self.falling[game]])
+            board.falling.initialize(board)
+
+        if self.next[game] >= 0:
+            board.next = Block(SHAPES[self.next[game]])
+
+        return board
+
+    def store(self, game, board):
+        """
+        Copies the cells and score of a board.Board back into a game.
+        """
+
+        self.grid[game] = np.frombuffer(board.colors, dtype=np.int8).reshape(
+            self.height,
+            self.width
+        )
+        self.score[game] = board.score
+
+
+class PlacementPlayer:
+    """
+    Plays placements drawn from a random generator, the same way the batch
+    demo below does. Records the board it is shown before every placement.
+    """
+
+    def __init__(self, random, width):
+        self.random = random
+        self.width = width
+        self.seen = []
+
+    def choose_action(self, board):
+        self.seen.append((frozenset(board.cells), board.score))
+        rotation = self.random.randrange(4)
+        move = self.random.randrange(-self.width // 2, self.width // 2)
+        return placement_actions(rotation, move)
+
+
+def verify(seeds, blocks, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    """
+    Plays random placements for every seed both in a batch and on
+    board.Board, and checks that every game went exactly the same way.
+    Returns the number of placements compared.
+    """
+
+    references = []
+    for seed in seeds:
+        board = Board(width, height)
+        player = PlacementPlayer(Random(seed), width)
+        try:
+            for move in board.run(player, RandomAdversary(seed, blocks)):
+                pass
+        except BlockLimitException:
+            pass
+        player.seen.append((frozenset(board.cells), board.score))
+        references.append(player.seen)
+
+    env = BatchEnvironment.seeded(seeds, blocks, width=width, height=height)
+    randoms = [Random(seed) for seed in seeds]
+
+    compared = 0
+    step = 0
+    while True:
+        for game, seen in enumerate(references):
+            if step >= len(seen):
+                continue
+            cells, score = seen[step]
+            board = env.board(game)
+            assert board.cells == cells, f'cells differ in game {game}'
+            assert board.score == score, f'score differs in game {game}'
+            compared += 1
+
+        if env.done.all():
+            break
+
+        rotations = [random.randrange(4) for random in randoms]
+        moves = [
+            random.randrange(-width // 2, width // 2) for random in randoms
+        ]
+        env.step(rotations, moves)
+        step += 1
+
+    return compared
+
+
+def build_decision_cache(path, seeds, blocks=BLOCK_LIMIT, capacity=1 << 20):
+    """
+    Plays MyPlayer in every seeded game and stores every decision it makes
+    in a new decision cache. Situations that were already decided are taken
+    from the cache, as the player would at runtime. Returns the number of
+    decisions stored.
+    """
+
+    cache = DecisionCache.create(path, BOARD_WIDTH, BOARD_HEIGHT, capacity)
+    env = BatchEnvironment.seeded(seeds, blocks)
+    players = [MyPlayer() for _ in seeds]
+
+    try:
+        while not env.done.all():
+            rotations = np.zeros(env.size, dtype=np.intp)
+            moves = np.zeros(env.size, dtype=np.intp)
+
+            for game in np.flatnonzero(~env.done):
+                board = env.board(game)
+                player = players[game]
+                columns = player.generate_column_height(board)
+                key = surface_key(
+                    board,
+                    player.in_danger(columns, board.height)
+                )
+
+                decision = cache.get(key)
+                if decision is None:
+                    player.simulate_best_position(board)
+                    decision = (
+                        player.best_rotation_position,
+                        player.best_horizontal_position
+                    )
+                    if not cache.put(key, *decision):
+                        # The table is full; keep what we have.
+                        return cache.count
+
+                rotations[game], moves[game] = decision
+
+            env.step(rotations, moves)
+
+        return cache.count
+    finally:
+        cache.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Play many games of Tetris at once'
+    )
+    parser.add_argument('--games', default=1000, type=int)
+    parser.add_argument('--blocks', default=BLOCK_LIMIT, type=int)
+    parser.add_argument(
+        '--adversary',
+        default='random',
+        choices=sorted(adversaries)
+    )
+    parser.add_argument(
+        '--verify',
+        default=0,
+        type=int,
+        help='Check this many games against board.Board first'
+    )
+    parser.add_argument(
+        '--build-cache',
+        metavar='PATH',
+        help='Build a decision cache for MyPlayer from these games instead'
+    )
+    args = parser.parse_args()
+
+    if args.build_cache:
+        stored = build_decision_cache(
+            args.build_cache,
+            range(args.games),
+            args.blocks
+        )
+        print(f'{stored} decisions stored in {args.build_cache}')
+        raise SystemExit
+
+    if args.verify:
+        compared = verify(range(args.verify), args.blocks)
+        print(f'{compared} placements agree with board.Board')
+
+    env = BatchEnvironment.seeded(
+        range(args.games),
+        args.blocks,
+        adversaries[args.adversary]
+    )
+    random = np.random.default_rng(0)
+
+    start = time.monotonic()
+    placements = 0
+    while not env.done.all():
+        placements += int((~env.done).sum())
+        env.step(
+            random.integers(0, 4, env.size),
+            random.integers(-5, 5, env.size)
+        )
+    elapsed = time.monotonic() - start
+
+    print(
+        f'{args.games} games, {placements} placements in {elapsed:.2f}s '
+        f'({placements / elapsed:.0f} placements/s), '
+        f'mean score {env.score.mean():.1f}'
+    )
@@ -0,0 +1,115 @@
+from adversary import RandomAdversary
+from board import Block, Board, Shape
+from exceptions import BlockLimitException
+from player import MyPlayer, RandomPlayer
+
+import argparse
+import time
+
+
+SIZES = [(10, 24), (20, 40), (100, 200)]
+
+
+def measure(board, player, adversary):
+    """
+    Plays until the game ends or the adversary runs out of blocks. Returns
+    the number of moves and blocks, and the seconds it took.
+    """
+
+    moves = blocks = 0
+    start = time.perf_counter()
+    try:
+        for move in board.run(player, adversary):
+            if isinstance(move, Shape):
+                blocks += 1
+            else:
+                moves += 1
+    except BlockLimitException:
+        pass
+    return moves, blocks, time.perf_counter() - start
+
+
+def measure_search(board, player, adversary):
+    """
+    Times one decision searched in full, without a deadline, on a board
+    with only its first two blocks. Returns the seconds it took.
+    """
+
+    board.next = Block(adversary.choose_block(board))
+    board.place_next_block()
+    board.next = Block(adversary.choose_block(board))
+
+    start = time.perf_counter()
+    player.simulate_best_position(board)
+    return time.perf_counter() - start
+
+
+parser = argparse.ArgumentParser(
+    description='Time the engine and player on boards of different sizes'
+)
+parser.add_argument('--seed', default=0, type=int)
+parser.add_argument(
+    '--blocks',
+    default=20,
+    type=int,
+    help='Blocks the player places on every board'
+)
+parser.add_argument(
+    '--random-blocks',
+    default=200,
+    type=int,
+    help='Blocks placed by random moves on every board'
+)
+parser.add_argument(
+    '--deadline',
+    default=1000,
+    type=float,
+    help='Milliseconds the player may take per decision'
+)
+parser.add_argument(
+    '--full-search',
+    default=True,
+    action=argparse.BooleanOptionalAction,
+    help='Also time a decision without a deadline (which takes half a '
+         'minute on the largest board)'
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    for width, height in SIZES:
+        moves, blocks, elapsed = measure(
+            Board(width, height),
+            RandomPlayer(args.seed),
+            RandomAdversary(args.seed, args.random_blocks)
+        )
+        print(
+            f'{width}x{height} engine: {moves / elapsed:.0f} moves/s, '
+            f'{elapsed / moves * 1e6:.1f}us per move'
+        )
+
+        player = MyPlayer(deadline=args.deadline / 1000)
+        moves, blocks, elapsed = measure(
+            Board(width, height),
+            player,
+            RandomAdversary(args.seed, args.blocks)
+        )
+        searched, total = player.coverage
+        print(
+            f'{width}x{height} player: {elapsed / blocks * 1000:.0f}ms per '
+            f'block, last search covered {searched}/{total} placements'
+        )
+
+        if args.full_search:
+            player = MyPlayer()
+            elapsed = measure_search(
+                Board(width, height),
+                player,
+                RandomAdversary(args.seed, 2)
+            )
+            searched, total = player.coverage
+            print(
+                f'{width}x{height} full search: {elapsed * 1000:.0f}ms per '
+                f'decision, {elapsed / total * 1000:.1f}ms per placement'
+            )
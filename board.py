@@ -1,6 +1,22 @@
 from enum import Enum
+from functools import lru_cache
 from threading import Lock
-from exceptions import NoBlockException
+from events import (
+    ActionTaken,
+    BlockChosen,
+    BlockLanded,
+    BlockMoved,
+    BlockRotated,
+    BlockSpawned,
+    GameOver,
+    LinesCleared,
+    ScoreChanged,
+)
+from exceptions import (
+    BlockLimitException,
+    NoBlockException,
+    ReadOnlyBoardException,
+)
 
 
 class Direction(Enum):
@@ -83,6 +99,15 @@ shape_to_color = {
     Shape.Z: "red",
 }
 
+# Shapes are stored in color planes by their index in this list, so that zero
+# can mean an empty cell.
+index_to_shape = [None] + list(Shape)
+shape_to_index = {shape: i for i, shape in enumerate(index_to_shape) if shape}
+
+
+# Points for clearing a number of lines at once.
+line_scores = [0, 100, 400, 800, 1600]
+
 
 shape_to_center = {
     Shape.I: (0.5, 1.5),
@@ -128,20 +153,136 @@ class Bitmap:
         return cell in self.cells
 
 
+class Orientation:
+    """
+    A shape rotated a number of times anticlockwise from how it spawns: its
+    cells relative to its top left corner, as such and as row bitmasks, its
+    size, the topmost and bottommost cell of every column, and the offset of
+    its top left corner from the center it rotates around.
+    """
+
+    cells = None
+    masks = None
+    width = None
+    height = None
+    tops = None
+    bottoms = None
+    corner = None
+
+    def __init__(self, cells, center):
+        left = min(x for (x, y) in cells)
+        top = min(y for (x, y) in cells)
+        self.cells = tuple(sorted((x - left, y - top) for (x, y) in cells))
+        self.corner = left - center[0], top - center[1]
+
+        self.width = max(x for (x, y) in self.cells) + 1
+        self.height = max(y for (x, y) in self.cells) + 1
+        self.masks = [0] * self.height
+        for (x, y) in self.cells:
+            self.masks[y] |= 1 << x
+
+        self.tops = [
+            min(y for (cx, y) in self.cells if cx == x)
+            for x in range(self.width)
+        ]
+        self.bottoms = [
+            max(y for (cx, y) in self.cells if cx == x)
+            for x in range(self.width)
+        ]
+
+
+@lru_cache(maxsize=None)
+def shape_rotations(shape):
+    """
+    Returns the four orientations of a shape, indexed by the number of times
+    it was rotated anticlockwise, together with how far the top left corner
+    moves when rotating from one orientation to another.
+    """
+
+    cells = shape_to_cells[shape]
+    cx, cy = shape_to_center[shape]
+
+    orientations = []
+    for _ in range(4):
+        orientations.append(Orientation(cells, (cx, cy)))
+        # Rotating anticlockwise around the center, as Block.rotate does.
+        # All coordinates come out whole, so this is exact.
+        cells = {(int(y-cy+cx), int(-(x-cx)+cy)) for (x, y) in cells}
+
+    shifts = [
+        [
+            (
+                int(after.corner[0] - before.corner[0]),
+                int(after.corner[1] - before.corner[1])
+            )
+            for after in orientations
+        ]
+        for before in orientations
+    ]
+
+    return tuple(orientations), shifts
+
+
 class Block(Bitmap):
     """
     Keeps track of the position of cells of a block.
+
+    The position is kept as the orientation of the block and the position of
+    its top left corner, so that its extents are known and it can be tested
+    against the rows of a board as bitmasks. The cells are worked out from
+    those when asked for.
     """
 
     shape = None
     color = None
     center = None
 
+    rotation = None
+    x = None
+    y = None
+
+    # The orientations of the shape, the one the block is in, and how far the
+    # top left corner moves when rotating between them.
+    orientations = None
+    orientation = None
+    shifts = None
+
+    # The cells last worked out, and the position they were worked out for.
+    cached_cells = None
+    position = None
+
     def __init__(self, shape=None):
         self.shape = shape
         self.color = shape_to_color[shape]
-        self.cells = shape_to_cells[shape]
         self.center = shape_to_center[shape]
+        self.orientations, self.shifts = shape_rotations(shape)
+        self.set_position(0, 0, 0)
+
+    def set_position(self, rotation, x, y):
+        """
+        Puts the block in the given orientation with its top left corner at
+        the given position.
+        """
+
+        self.rotation = rotation
+        self.orientation = self.orientations[rotation]
+        self.x = x
+        self.y = y
+        self.position = None
+
+    @property
+    def cells(self):
+        # Only rebuilt after the block moved, so that the same set is
+        # returned for as long as the block stays in place.
+        position = (self.rotation, self.x, self.y)
+        if self.position != position:
+            x = self.x
+            y = self.y
+            self.cached_cells = {
+                (x + cx, y + cy) for (cx, cy) in self.orientation.cells
+            }
+            self.position = position
+        return self.cached_cells
 
     @property
     def left(self):
@@ -149,7 +290,7 @@ class Block(Bitmap):
         The leftmost x-position of the block.
         """
 
-        return min(x for (x, y) in self)
+        return self.x
 
     @property
     def right(self):
@@ -157,7 +298,7 @@ class Block(Bitmap):
         The rightmost x-position of the block.
         """
 
-        return max(x for (x, y) in self)
+        return self.x + self.orientation.width - 1
 
     @property
     def top(self):
@@ -165,7 +306,7 @@ class Block(Bitmap):
         The topmost y-position of the block.
         """
 
-        return min(y for (x, y) in self)
+        return self.y
 
     @property
     def bottom(self):
@@ -173,7 +314,20 @@ class Block(Bitmap):
         The bottommost y-position of the block.
         """
 
-        return max(y for (x, y) in self)
+        return self.y + self.orientation.height - 1
+
+    def overlaps(self, board, dy=0):
+        """
+        Checks whether the block, moved down dy rows, overlaps any cell on
+        the board.
+        """
+
+        return board.overlaps(self.orientation.masks, self.x, self.y + dy)
+
+    def collides(self, other):
+        if isinstance(other, Board):
+            return self.overlaps(other)
+        return super().collides(other)
 
     def initialize(self, board):
         """
@@ -182,19 +336,19 @@ class Block(Bitmap):
 
         center = self.left + (self.right - self.left) // 2
         shift = board.width // 2 - center
-        self.cells = {(x+shift, y) for (x, y) in self}
+        self.set_position(self.rotation, self.x + shift, self.y)
         self.center = self.center[0] + shift, self.center[1]
 
-    def supported(self, board):
+    def supported(self, board, dy=0):
         """
         Returns true if and only if the block is supported by the bottom of
         the board, or by another block. Basically, this means that moving the
         block down once more will mark it as dropped.
         """
 
-        return any(
-            (x, y+1) in board or y+1 == board.height
-            for (x, y) in self
+        return (
+            self.bottom + dy + 1 >= board.height or
+            self.overlaps(board, dy + 1)
         )
 
     def move(self, direction, board, count=1):
@@ -203,22 +357,20 @@ class Block(Bitmap):
         true if this action caused the block to be dropped, false otherwise.
         """
 
-        old_cells = self.cells
-
         if direction == Direction.Right:
-            self.cells = {(x+count, y) for (x, y) in self}
+            self.set_position(self.rotation, self.x + count, self.y)
             if self.right >= board.width or self.collides(board):
                 # We hit something by moving; undo.
-                self.cells = old_cells
+                self.set_position(self.rotation, self.x - count, self.y)
             else:
                 self.center = self.center[0]+count, self.center[1]
             return False
 
         elif direction == Direction.Left:
-            self.cells = {(x-count, y) for (x, y) in self}
+            self.set_position(self.rotation, self.x - count, self.y)
             if self.left < 0 or self.collides(board):
                 # We hit something by moving; undo.
-                self.cells = old_cells
+                self.set_position(self.rotation, self.x + count, self.y)
             else:
                 self.center = self.center[0]-count, self.center[1]
             return False
@@ -229,15 +381,17 @@ class Block(Bitmap):
                 # as dropped and do not move it.
                 return True
 
-            self.cells = {(x, y+count) for (x, y) in self}
+            self.set_position(self.rotation, self.x, self.y + count)
             # Score a point for every row a block drops.
             board.score += count
             self.center = self.center[0], self.center[1]+count
             return False
 
         elif direction == Direction.Drop:
-            while not self.supported(board):
-                self.move(Direction.Down, board)
+            # Find how far the block falls first, then move it there at once.
+            distance = board.drop_distance(self.orientation.masks, self.x, self.y)
+            if distance:
+                self.move(Direction.Down, board, distance)
             return True
 
     def rotate(self, rotation, board):
@@ -246,16 +400,17 @@ class Block(Bitmap):
         action caused the block to be dropped, false otherwise.
         """
 
-        # Save cells so we can cancel later.
-        old_cells = self.cells
+        # Save the position so we can cancel later.
+        old_position = self.rotation, self.x, self.y
         old_center = self.center
 
         # Rotate around the center, which remains in place.
-        cx, cy = self.center
         if rotation == Rotation.Clockwise:
-            self.cells = {(int(-(y-cy)+cx), int(x-cx+cy)) for (x, y) in self}
+            new = (self.rotation - 1) % 4
         elif rotation == Rotation.Anticlockwise:
-            self.cells = {(int(y-cy+cx), int(-(x-cx)+cy)) for (x, y) in self}
+            new = (self.rotation + 1) % 4
+        dx, dy = self.shifts[self.rotation][new]
+        self.set_position(new, self.x + dx, self.y + dy)
 
         try:
             # If block has hit left boundary, back off.
@@ -292,12 +447,12 @@ class Block(Bitmap):
 
         except MoveFailedException:
             # Go back to the old position if the rotation failed.
-            self.cells = old_cells
+            self.set_position(*old_position)
             self.center = old_center
 
     def clone(self):
         block = Block(self.shape)
-        block.cells = set(self)
+        block.set_position(self.rotation, self.x, self.y)
         block.center = self.center
         return block
 
@@ -307,6 +462,10 @@ class Board(Bitmap):
     Class that keeps track of occupied cells and the current falling block,
     as well as the score of the player. Can be used to duplicate the current
     state and explore possible future moves.
+
+    The occupied cells are kept as one bitmask per row, so that landing a
+    block and clearing lines only touch the rows concerned. The cells as a
+    set are worked out from those when asked for.
     """
 
     width = None
@@ -314,40 +473,208 @@ class Board(Bitmap):
     score = None
     lock = None
 
+    colors = None
+    colors_shared = None
+
     falling = None
     next = None
 
     players_turn = None
 
+    # Callbacks receiving an events.Event for everything that happens on the
+    # board, and the events waiting to be delivered to them. Clones start
+    # without subscribers.
+    subscribers = None
+    pending = None
+
+    # The cells as one bitmask per row, with bit x set when (x, y) is
+    # occupied. A tuple, so that clones and views can share it; changing the
+    # cells means replacing it.
+    masks = None
+
+    # The cells last worked out from the masks, and the masks they were
+    # worked out from.
+    cached_cells = None
+    cells_of = None
+
+    # The lines the block that landed last cleared, as clear_lines returns.
+    cleared = None
+
     def __init__(self, width, height, score=0):
         self.width = width
         self.height = height
         self.score = score
-        self.cells = set()
-        self.cellcolor = {}
+        self.masks = (0,) * height
+        self.colors = bytearray(width * height)
+        self.colors_shared = False
+        self.lock = Lock()
+
+    def __getstate__(self):
+        # Locks cannot be pickled; the copy gets a fresh one instead.
+        state = dict(self.__dict__)
+        del state['lock']
+        state.pop('subscribers', None)
+        state.pop('pending', None)
+        state['colors'] = bytearray(self.colors)
+        state['colors_shared'] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
         self.lock = Lock()
 
+    @property
+    def cells(self):
+        """
+        The occupied cells, as a frozenset. Only worked out again after the
+        cells changed.
+        """
+
+        if self.cells_of is not self.masks:
+            cells = []
+            for y, mask in enumerate(self.masks):
+                while mask:
+                    low = mask & -mask
+                    cells.append((low.bit_length() - 1, y))
+                    mask ^= low
+            self.cached_cells = frozenset(cells)
+            self.cells_of = self.masks
+        return self.cached_cells
+
+    @cells.setter
+    def cells(self, cells):
+        masks = [0] * self.height
+        for (x, y) in cells:
+            masks[y] |= 1 << x
+        self.masks = tuple(masks)
+        self.cached_cells = frozenset(cells)
+        self.cells_of = self.masks
+
+    def __contains__(self, cell):
+        x, y = cell
+        return 0 <= y < self.height and x >= 0 and self.masks[y] >> x & 1 == 1
+
+    def row_masks(self):
+        """
+        Returns the occupied cells as a tuple of one bitmask per row, with bit
+        x set when (x, y) is occupied.
+        """
+
+        return self.masks
+
+    def overlaps(self, masks, x, y):
+        """
+        Checks whether a shape given as row bitmasks, with its top left corner
+        at (x, y), overlaps any occupied cell. Rows above and below the board
+        never overlap.
+        """
+
+        rows = self.masks
+        height = self.height
+        for i, mask in enumerate(masks):
+            if 0 <= y + i < height:
+                if rows[y + i] & (mask << x if x >= 0 else mask >> -x):
+                    return True
+        return False
+
+    def drop_distance(self, masks, x, y):
+        """
+        Returns how many rows a shape given as row bitmasks, with its top left
+        corner at (x, y), falls before it rests on the floor or on occupied
+        cells.
+        """
+
+        rows = self.masks
+        height = self.height
+        size = len(masks)
+
+        # Empty rows cannot stop the shape; skip ahead to where its bottom
+        # row reaches the first occupied row under it.
+        first = y + 1
+        while first < height and not rows[first]:
+            first += 1
+
+        shifted = [mask << x for mask in masks]
+        for below in range(max(y + 1, first - size + 1), height - size + 1):
+            for i, mask in enumerate(shifted):
+                if rows[below + i] & mask:
+                    return below - y - 1
+        return height - size - y
+
+    def shape_at(self, x, y):
+        """
+        Returns the shape of the block that left the cell at the given
+        position occupied, or None if it is empty.
+        """
+
+        return index_to_shape[self.colors[y * self.width + x]]
+
+    def own_colors(self):
+        """
+        Makes sure the color plane is not shared with any clones before it
+        is modified.
+        """
+
+        if self.colors_shared:
+            self.colors = bytearray(self.colors)
+            self.colors_shared = False
+
     def line_full(self, line):
         """
         Checks if the given line is fully occupied by cells.
         """
 
-        return all((x, line) in self for x in range(0, self.width))
+        return self.masks[line] == (1 << self.width) - 1
 
     def remove_line(self, line):
         """
         Removes all blocks on a given line and moves down all blocks above.
         """
 
-        self.cellcolor = {
-            (x, y) if y > line else (x, y+1): c
-            for (x, y), c in self.cellcolor.items() if y != line
-        }
+        self.own_colors()
+        width = self.width
+        self.colors[width:(line+1)*width] = self.colors[:line*width]
+        self.colors[:width] = bytes(width)
+
+        masks = self.masks
+        self.masks = (0,) + masks[:line] + masks[line+1:]
+
+    def subscribe(self, subscriber):
+        """
+        Calls subscriber with every event on the board from now on. Events
+        are delivered after the action causing them has completed, outside
+        of the lock.
+        """
+
+        if not self.subscribers:
+            self.subscribers = []
+            self.pending = []
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.remove(subscriber)
+
+    def emit(self, event):
+        """
+        Queues an event for the subscribers. Only call this when there are
+        subscribers, so that nothing is built for nobody.
+        """
+
+        self.pending.append(event)
+
+    def publish(self, score=None):
+        """
+        Delivers the queued events, reporting a change of score first if the
+        score differs from the one given.
+        """
+
+        if score is not None and self.score != score:
+            self.pending.append(ScoreChanged(self.score, self.score - score))
 
-        self.cells = {
-            (x, y) if y > line else (x, y+1)
-            for (x, y) in self if y != line
-        }
+        events, self.pending = self.pending, []
+        for event in events:
+            for subscriber in self.subscribers:
+                subscriber(event)
 
     def clean(self):
         """
@@ -355,17 +682,36 @@ class Board(Bitmap):
         above the cleaned lines down as well.
         """
 
-        scores = [0, 100, 400, 800, 1600]
-        removed = 0
+        return line_scores[len(self.clear_lines())]
 
-        line = self.height-1
-        while line > 0:
-            while self.line_full(line):
-                self.remove_line(line)
-                removed += 1
-            line -= 1
+    def clear_lines(self, lines=None):
+        """
+        Does the cleaning for clean. Only the given lines are looked at, if
+        any; when a block lands, no other line can have filled up. Returns
+        the indices the removed lines had before any of them was removed,
+        from the bottom up.
+        """
 
-        return scores[removed]
+        if lines is None:
+            lines = range(self.height)
+
+        full = (1 << self.width) - 1
+        masks = self.masks
+        rows = sorted(
+            (line for line in lines if line > 0 and masks[line] == full),
+            reverse=True
+        )
+
+        # The top line is never looked at, but a full one moves down with
+        # every line removed below it and is removed after them.
+        if rows and masks[0] == full:
+            rows.append(0)
+
+        for removed, line in enumerate(rows):
+            # Every line removed so far moved this one down by one.
+            self.remove_line(line + removed)
+
+        return rows
 
     @property
     def alive(self):
@@ -384,6 +730,8 @@ class Board(Bitmap):
         # Place the next block, if it exists.
         if self.falling is not None:
             self.falling.initialize(self)
+            if self.subscribers:
+                self.emit(BlockSpawned(self.falling.shape, self.falling.cells))
 
         self.next = None
 
@@ -394,7 +742,17 @@ class Board(Bitmap):
         """
 
         # Ask the adversary for a new next block.
-        self.next = Block(adversary.choose_block(self))
+        try:
+            self.next = Block(adversary.choose_block(self))
+        except BlockLimitException:
+            if self.subscribers:
+                self.emit(GameOver(self.score, True))
+                self.publish()
+            raise
+
+        if self.subscribers:
+            self.emit(BlockChosen(self.next.shape))
+            self.publish()
         return self.next.shape
 
     def run_player(self, player):
@@ -405,7 +763,9 @@ class Board(Bitmap):
         """
 
         while True:
-            actions = player.choose_action(self.clone())
+            # Players get a view rather than a copy; most never look at the
+            # board, and those that simulate moves clone it themselves.
+            actions = player.choose_action(BoardView(self))
 
             try:
                 actions = iter(actions)
@@ -440,6 +800,8 @@ class Board(Bitmap):
 
         # Place this block on the board
         self.place_next_block()
+        if self.subscribers:
+            self.publish()
 
         while True:
             # The adversary can now choose a new next block.
@@ -447,23 +809,55 @@ class Board(Bitmap):
 
             # The block may have caused the end of the game.
             if not self.alive:
+                if self.subscribers:
+                    self.emit(GameOver(self.score, False))
+                    self.publish()
                 return
 
             # Ask the player for the next move(s) to make.
             yield from self.run_player(player)
 
     def land_block(self):
-        # A fallen block becomes part of the cells on the board.
-        self.cells |= self.falling.cells
-        for pos in self.falling.cells:
-            self.cellcolor[pos] = self.falling.color
+        # A fallen block becomes part of the cells on the board; only the
+        # rows it lands in change.
+        block = self.falling
+        masks = list(self.masks)
+        for dy, mask in enumerate(block.orientation.masks):
+            masks[block.y + dy] |= mask << block.x
+        self.masks = tuple(masks)
+        self.own_colors()
+        index = shape_to_index[block.shape]
+        for (x, y) in block.cells:
+            self.colors[y * self.width + x] = index
         self.falling = None
 
         # Clean up any completed rows and adjust score.
-        self.score += self.clean()
+        rows = self.clear_lines(
+            range(block.y, block.y + block.orientation.height)
+        )
+        self.cleared = rows
+        self.score += line_scores[len(rows)]
+
+        if self.subscribers:
+            if rows:
+                self.emit(LinesCleared(rows))
+            self.emit(BlockLanded(block.shape, block.cells, len(rows)))
 
         self.place_next_block()
 
+    def fall(self):
+        """
+        Applies the implicit move down. Returns True if that landed the
+        falling block, which is then still to be landed by the caller.
+        """
+
+        block = self.falling
+        position = block.rotation, block.x, block.y
+        landed = block.move(Direction.Down, self)
+        if self.subscribers and position != (block.rotation, block.x, block.y):
+            self.emit(BlockMoved(Direction.Down, block.cells))
+        return landed
+
     def move(self, direction):
         """
         Moves the current block in the direction given, and applies the
@@ -475,16 +869,23 @@ class Board(Bitmap):
             raise NoBlockException
 
         with self.lock:
-            if self.falling.move(direction, self):
+            score = self.score
+            if self.subscribers:
+                self.emit(ActionTaken(direction))
+            block = self.falling
+            position = block.rotation, block.x, block.y
+            landed = block.move(direction, self)
+            if self.subscribers and position != (block.rotation, block.x, block.y):
+                self.emit(BlockMoved(direction, block.cells))
+
+            # If the block has not fallen yet, apply the implicit move down.
+            if landed or self.fall():
                 self.land_block()
-                return True
+                landed = True
 
-            # Block has not fallen yet; apply the implicit move down.
-            if self.falling.move(Direction.Down, self):
-                self.land_block()
-                return True
-            else:
-                return False
+        if self.subscribers:
+            self.publish(score)
+        return landed
 
     def rotate(self, rotation):
         """
@@ -497,14 +898,23 @@ class Board(Bitmap):
             raise NoBlockException
 
         with self.lock:
-            self.falling.rotate(rotation, self)
+            score = self.score
+            if self.subscribers:
+                self.emit(ActionTaken(rotation))
+            block = self.falling
+            position = block.rotation, block.x, block.y
+            block.rotate(rotation, self)
+            if self.subscribers and position != (block.rotation, block.x, block.y):
+                self.emit(BlockRotated(rotation, block.cells))
 
             # Apply the implicit move down.
-            if self.falling.move(Direction.Down, self):
+            landed = self.fall()
+            if landed:
                 self.land_block()
-                return True
-            else:
-                return False
+
+        if self.subscribers:
+            self.publish(score)
+        return landed
 
     def skip(self):
         """
@@ -516,10 +926,16 @@ class Board(Bitmap):
             raise NoBlockException
 
         with self.lock:
-            res = self.falling.move(Direction.Down, self)
+            score = self.score
+            if self.subscribers:
+                self.emit(ActionTaken(None))
+            res = self.fall()
             if res:
                 self.land_block()
-            return res
+
+        if self.subscribers:
+            self.publish(score)
+        return res
 
     def clone(self):
         """
@@ -527,7 +943,15 @@ class Board(Bitmap):
         """
 
         board = Board(self.width, self.height, self.score)
-        board.cells = set(self)
+
+        # The cells are immutable, so the copy can share them.
+        board.masks = self.masks
+        board.cached_cells = self.cached_cells
+        board.cells_of = self.cells_of
+
+        # Share the color plane until either board changes it.
+        board.colors = self.colors
+        board.colors_shared = self.colors_shared = True
 
         # Copy the falling block, if any.
         if self.falling is not None:
@@ -538,3 +962,85 @@ class Board(Bitmap):
             board.next = self.next.clone()
 
         return board
+
+
+class BoardView:
+    """
+    A read-only view of a live board, given to players instead of a copy of
+    it. Reading works as on the board itself, but anything that would change
+    the board raises a ReadOnlyBoardException; players that want to try out
+    moves have to clone it first. The cells and row masks are handed out as
+    they are, as the board keeps them immutable. The falling and next blocks
+    are copies, only made when asked for.
+    """
+
+    # Methods of Board that change it, and attributes that could be changed
+    # in place.
+    mutators = frozenset({
+        'clean',
+        'clear_lines',
+        'emit',
+        'fall',
+        'land_block',
+        'lock',
+        'move',
+        'own_colors',
+        'pending',
+        'place_next_block',
+        'publish',
+        'remove_line',
+        'rotate',
+        'run',
+        'run_adversary',
+        'run_player',
+        'skip',
+        'subscribe',
+        'subscribers',
+        'unsubscribe',
+    })
+
+    def __init__(self, board):
+        object.__setattr__(self, 'board', board)
+        object.__setattr__(self, 'blocks', {})
+
+    def __getattr__(self, name):
+        if name in self.mutators:
+            raise ReadOnlyBoardException(name)
+        return getattr(self.board, name)
+
+    def __setattr__(self, name, value):
+        raise ReadOnlyBoardException(name)
+
+    def __delattr__(self, name):
+        raise ReadOnlyBoardException(name)
+
+    def __iter__(self):
+        return iter(self.board)
+
+    def __contains__(self, cell):
+        return cell in self.board
+
+    def block(self, name):
+        if name not in self.blocks:
+            block = getattr(self.board, name)
+            self.blocks[name] = None if block is None else block.clone()
+        return self.blocks[name]
+
+    @property
+    def falling(self):
+        return self.block('falling')
+
+    @property
+    def next(self):
+        return self.block('next')
+
+    @property
+    def colors(self):
+        return memoryview(self.board.colors).toreadonly()
+
+    def clone(self):
+        """
+        Creates a copy of the board, which can be changed.
+        """
+
+        return self.board.clone()
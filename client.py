@@ -1,14 +1,25 @@
-from adversary import RandomAdversary
-from board import Board, Direction, Rotation, Shape
+from adversary import adversaries
+from board import Board, Direction, Rotation
+from events import BlockChosen, BlockLanded, GameOver, ScoreChanged
 from constants import BOARD_HEIGHT, BOARD_WIDTH, BLOCK_LIMIT, PREFIX
 from exceptions import UnknownInstructionException, BlockLimitException
+from metrics import Metrics, dump_periodically, send_periodically, serve
 from player import Player
 
 from sys import stderr
 from os import getenv
+from time import monotonic
+
+import json
 
 
 class RemotePlayer(Player):
+    metrics = None
+    shape_sent = None
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+
     def choose_action(self, board):
         while True:
             try:
@@ -19,6 +30,13 @@ class RemotePlayer(Player):
             if instruction.startswith(PREFIX):
                 break
 
+        if self.metrics is not None:
+            self.metrics.message('received')
+            if self.shape_sent is not None:
+                # First action since the player learned about a new shape.
+                self.metrics.decision(monotonic() - self.shape_sent)
+                self.shape_sent = None
+
         instruction = instruction[len(PREFIX)+1:]
 
         if instruction == 'SKIP':
@@ -37,24 +55,77 @@ class RemotePlayer(Player):
         raise UnknownInstructionException
 
 
+# Metrics are only collected when asked for, through METRICS_PORT (serving
+# them over HTTP), METRICS_INTERVAL (writing summaries to stderr) and/or
+# METRICS_SUMMARY (only writing a summary at the end of the game, followed by
+# the metrics themselves for tournament.py to merge). With METRICS_UPDATES,
+# the metrics are written every so many seconds while the game goes on, as
+# what changed since they were last written, so tournament.py can merge them
+# as they come.
+#
+# The HTTP endpoint only lives as long as this one game, and every referee
+# needs a port of its own. To watch many games, run them through
+# tournament.py --metrics-port instead, which serves the merged metrics.
+metrics = None
+if (getenv('METRICS_PORT') or getenv('METRICS_INTERVAL') or
+        getenv('METRICS_SUMMARY') or getenv('METRICS_UPDATES')):
+    metrics = Metrics()
+    if getenv('METRICS_PORT'):
+        try:
+            serve(metrics, int(getenv('METRICS_PORT')))
+        except OSError as error:
+            # Play the game anyway; the metrics are just not served.
+            stderr.write(f'metrics: not serving: {error}\n')
+    if getenv('METRICS_INTERVAL'):
+        dump_periodically(metrics, float(getenv('METRICS_INTERVAL')), stderr)
+    if getenv('METRICS_UPDATES'):
+        send_periodically(metrics, float(getenv('METRICS_UPDATES')), stderr)
+
 board = Board(BOARD_WIDTH, BOARD_HEIGHT)
 
-player = RemotePlayer()
-adversary = RandomAdversary(getenv('SEED'), BLOCK_LIMIT)
+player = RemotePlayer(metrics)
+adversary = adversaries[getenv('ADVERSARY', 'random')](
+    getenv('SEED'),
+    BLOCK_LIMIT
+)
 
 
-score = 0
-try:
-    for move in board.run(player, adversary):
-        if isinstance(move, Shape):
-            print(f'{PREFIX} {move.value}')
+def send(message):
+    print(f'{PREFIX} {message}')
+    if metrics is not None:
+        metrics.message('sent')
 
-        if board.score != score:
-            stderr.write(f'{board.score}\n')
-            score = board.score
+
+def report(event):
+    if isinstance(event, BlockChosen):
+        send(event.shape.value)
+        player.shape_sent = monotonic()
+    elif isinstance(event, ScoreChanged):
+        stderr.write(f'{event.score}\n')
+    elif isinstance(event, BlockLanded) and metrics is not None:
+        metrics.block_placed(event.lines)
+    elif isinstance(event, GameOver):
+        result = 'WON' if event.won else 'LOST'
+        stderr.write(f'{result}\n')
+        send(result)
+        if metrics is not None:
+            metrics.game_finished(event.won, event.score)
+
+
+board.subscribe(report)
+
+if metrics is not None:
+    metrics.game_started()
+
+try:
+    for _ in board.run(player, adversary):
+        pass
 except BlockLimitException:
-    stderr.write('WON\n')
-    print(f'{PREFIX} WON')
-else:
-    stderr.write('LOST\n')
-    print(f'{PREFIX} LOST')
+    # The game is won; report has announced that already.
+    pass
+
+if metrics is not None:
+    stderr.write(metrics.summary() + '\n')
+    if getenv('METRICS_SUMMARY') or getenv('METRICS_UPDATES'):
+        # Whatever was not written with the last update.
+        stderr.write(f'METRICS {json.dumps(metrics.changes())}\n')
@@ -1,8 +1,10 @@
-from adversary import RandomAdversary
-from arguments import parser
+from adversary import adversaries
+from arguments import parser, player_options
 from board import Board, Direction, Rotation
 from constants import BOARD_WIDTH, BOARD_HEIGHT, DEFAULT_SEED, INTERVAL
 from player import SelectedPlayer, Player
+from scene import Scene
+from simulation import Simulation
 from time import sleep
 
 import curses
@@ -35,66 +37,69 @@ def paint(window, x, y, color, count=1):
     window.addstr(y, x*2, '  ' * count, curses.color_pair(color))
 
 
-def render(window, board):
+def render(window, scene):
     """
-    Write a depiction of the board to standard output.
+    Write a depiction of the latest frame of the scene to standard output.
     """
 
-    for y in range(board.height):
+    frame = scene.frame
+    falling = frame.falling or (None, ())
+    for y in range(scene.height):
         # Draw each individual row
-        for x in range(board.width):
-            if board.falling is not None and (x, y) in board.falling:
+        for x in range(scene.width):
+            if (x, y) in falling[1]:
                 # Location is occupied by falling block
-                color = COLOR_NAMES[board.falling.color]
-            elif (x, y) in board:
+                color = COLOR_NAMES[falling[0]]
+            elif (x, y) in frame.landed:
                 # Location is occupied by fallen block
-                color = COLOR_NAMES[board.cellcolor[(x, y)]]
+                color = COLOR_NAMES[frame.landed[(x, y)]]
             else:
                 # There is nothing here.
                 color = COLOR_NOTHING
             paint(window, x+1, y, color)
 
     # Draw the next piece
-    if board.next is not None:
+    if frame.next is not None:
+        next_color, next_cells = frame.next
         for y in range(6):
             for x in range(4):
-                if (x, y) in board.next:
-                    color = COLOR_NAMES[board.next.color]
+                if (x, y) in next_cells:
+                    color = COLOR_NAMES[next_color]
                 else:
                     color = COLOR_NOTHING
 
-                paint(window, board.width+x+3, y+1, color)
+                paint(window, scene.width+x+3, y+1, color)
 
     # Draw the score line below the window.
     window.addstr(
-        board.height+2,
+        scene.height+2,
         0,
-        f'Score: {board.score} ',
+        f'Score: {frame.score} ',
         curses.color_pair(COLOR_NOTHING)
     )
 
     # Draw the board frame
     window.move(0, 0)
-    window.vline(curses.ACS_VLINE, board.height+2)
+    window.vline(curses.ACS_VLINE, scene.height+2)
     window.move(0, 1)
-    window.vline(curses.ACS_VLINE, board.height+1)
+    window.vline(curses.ACS_VLINE, scene.height+1)
     window.addch(0, 0, curses.ACS_ULCORNER)
     window.addch(0, 1, curses.ACS_URCORNER)
-    window.move(0, board.width*2+2)
-    window.vline(curses.ACS_VLINE, board.height+1)
-    window.move(0, board.width*2+3)
-    window.vline(curses.ACS_VLINE, board.height+2)
-    window.addch(0, board.width*2+2, curses.ACS_ULCORNER)
-    window.addch(0, board.width*2+3, curses.ACS_URCORNER)
-    window.move(board.height+1, 0)
-    window.hline(curses.ACS_HLINE, board.width*2+3)
-    window.move(board.height, 1)
-    window.hline(curses.ACS_HLINE, board.width*2+1)
-    window.addch(board.height+1, 0, curses.ACS_LLCORNER)
-    window.addch(board.height, 1, curses.ACS_LLCORNER)
-    window.addch(board.height+1, board.width*2+3, curses.ACS_LRCORNER)
-    window.addch(board.height, board.width*2+2, curses.ACS_LRCORNER)
-    window.move(board.height+2, 0)
+    window.move(0, scene.width*2+2)
+    window.vline(curses.ACS_VLINE, scene.height+1)
+    window.move(0, scene.width*2+3)
+    window.vline(curses.ACS_VLINE, scene.height+2)
+    window.addch(0, scene.width*2+2, curses.ACS_ULCORNER)
+    window.addch(0, scene.width*2+3, curses.ACS_URCORNER)
+    window.move(scene.height+1, 0)
+    window.hline(curses.ACS_HLINE, scene.width*2+3)
+    window.move(scene.height, 1)
+    window.hline(curses.ACS_HLINE, scene.width*2+1)
+    window.addch(scene.height+1, 0, curses.ACS_LLCORNER)
+    window.addch(scene.height, 1, curses.ACS_LLCORNER)
+    window.addch(scene.height+1, scene.width*2+3, curses.ACS_LRCORNER)
+    window.addch(scene.height, scene.width*2+2, curses.ACS_LRCORNER)
+    window.move(scene.height+2, 0)
 
     window.refresh()
 
@@ -132,29 +137,62 @@ class UserPlayer(Player):
             raise SystemExit
 
 
+def check_escape(window):
+    """
+    Drains pending key presses, exiting if escape was pressed.
+    """
+
+    while True:
+        key = window.getch()
+        if key == -1:
+            break
+        elif key == curses.ascii.ESC:
+            raise SystemExit
+
+
+def run_turbo(window, board, player, adversary, rate, fps):
+    """
+    Plays the game on a background thread and draws the latest state of the
+    board at a fixed frame rate.
+    """
+
+    scene = Scene(board)
+    simulation = Simulation(board, player, adversary, rate)
+    simulation.start()
+
+    while not simulation.finished:
+        render(window, scene)
+        check_escape(window)
+        sleep(1 / fps)
+
+    if simulation.error is not None:
+        raise simulation.error
+
+    render(window, scene)
+
+
 def run(window):
     board = Board(BOARD_WIDTH, BOARD_HEIGHT)
-    adversary = RandomAdversary(DEFAULT_SEED)
 
     args = parser.parse_args()
+    adversary = adversaries[args.adversary](DEFAULT_SEED)
     if args.manual:
         window.timeout(INTERVAL)
         player = UserPlayer(window)
     else:
         window.timeout(0)
-        player = SelectedPlayer()
-
-    for move in board.run(player, adversary):
-        render(window, board)
-
-        if not args.manual:
-            while True:
-                key = window.getch()
-                if key == -1:
-                    break
-                elif key == curses.ascii.ESC:
-                    raise SystemExit
-            sleep(0.1)
+        player = SelectedPlayer(**player_options(args))
+
+    if args.turbo and not args.manual:
+        run_turbo(window, board, player, adversary, args.rate, args.fps)
+    else:
+        scene = Scene(board)
+        for _ in board.run(player, adversary):
+            render(window, scene)
+
+            if not args.manual:
+                check_escape(window)
+                sleep(0.1)
 
     window.timeout(-1)
     window.getch()
@@ -0,0 +1,317 @@
+from adversary import adversaries
+from ast import literal_eval
+from board import Board
+from concurrent.futures import ProcessPoolExecutor
+from constants import BOARD_HEIGHT, BOARD_WIDTH, BLOCK_LIMIT, DEFAULT_SEED
+from headless import play
+from itertools import islice
+from math import log, sqrt
+from player import MyPlayer
+from statistics import NormalDist
+
+import argparse
+import inspect
+import os
+import time
+
+
+# Settings that are passed to MyPlayer when creating it; any other setting
+# overrides an attribute, such as one of the heuristic constants (but see
+# OVERWRITTEN).
+OPTIONS = set(inspect.signature(MyPlayer).parameters)
+
+# Constants that MyPlayer.search_window sets before every search, so that
+# setting them has no lasting effect, with the settings to use instead.
+# linesConstant is not among them: it is only replaced once the board is in
+# danger, and is the weight of lines until then.
+OVERWRITTEN = {
+    'heightConstant': ('dangerHeightConstant', 'safeHeightConstant'),
+    'holesConstant': ('dangerHolesConstant', 'safeHolesConstant'),
+}
+
+
+def setting(value):
+    """
+    Parses a name=value setting of a player configuration. Values are Python
+    literals, or strings if they are not.
+    """
+
+    name, separator, text = value.partition('=')
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f'Expected name=value, not {value!r}')
+
+    try:
+        value = literal_eval(text)
+    except (ValueError, SyntaxError):
+        value = text
+
+    if name in OVERWRITTEN:
+        raise argparse.ArgumentTypeError(
+            f'{name} is set by MyPlayer.search_window, set '
+            f'{" or ".join(OVERWRITTEN[name])} instead'
+        )
+    if name not in OPTIONS and not hasattr(MyPlayer, name):
+        raise argparse.ArgumentTypeError(f'MyPlayer has no setting {name!r}')
+    return name, value
+
+
+def create_player(settings):
+    """
+    Creates a MyPlayer with the given (name, value) settings applied.
+    """
+
+    options = {name: value for name, value in settings if name in OPTIONS}
+    player = MyPlayer(**options)
+    for name, value in settings:
+        if name not in OPTIONS:
+            setattr(player, name, value)
+    return player
+
+
+def play_game(seed, settings, adversary, blocks, width, height):
+    """
+    Plays one game with a player configured by the given settings. Returns
+    its score.
+    """
+
+    board = Board(width, height)
+    player = create_player(settings)
+    play(board, player, adversaries[adversary](seed, blocks))
+    return board.score
+
+
+class SequentialTest:
+    """
+    A sequential probability ratio test on the score differences between
+    two players over paired games (the same seed for both), telling apart
+    no improvement (a mean difference of zero) from an improvement by at
+    least the given margin.
+
+    The differences are taken to be normally distributed, with the variance
+    estimated from the games so far. After every pair the log likelihood
+    ratio is compared with the bounds following from the error rates alpha
+    (wrongly accepting an improvement) and beta (wrongly rejecting one).
+    """
+
+    margin = None
+    alpha = None
+    beta = None
+
+    count = None
+    total = None
+    squares = None
+
+    def __init__(self, margin, alpha=0.05, beta=0.05):
+        self.margin = margin
+        self.alpha = alpha
+        self.beta = beta
+        self.count = 0
+        self.total = 0
+        self.squares = 0
+
+    def add(self, difference):
+        self.count += 1
+        self.total += difference
+        self.squares += difference * difference
+
+    @property
+    def mean(self):
+        return self.total / self.count
+
+    @property
+    def variance(self):
+        """
+        The sample variance of the differences.
+        """
+
+        if self.count < 2:
+            return 0
+        return max(
+            self.squares - self.total * self.total / self.count, 0
+        ) / (self.count - 1)
+
+    @property
+    def bounds(self):
+        """
+        The log likelihood ratios below which no improvement is accepted and
+        above which an improvement is.
+        """
+
+        return (
+            log(self.beta / (1 - self.alpha)),
+            log((1 - self.beta) / self.alpha)
+        )
+
+    @property
+    def llr(self):
+        """
+        The log likelihood ratio of an improvement by the margin against no
+        improvement at all.
+        """
+
+        variance = self.variance
+        if not variance:
+            return 0
+        return self.margin / variance * (
+            self.total - self.count * self.margin / 2
+        )
+
+    def decision(self, minimum=2):
+        """
+        Returns True once an improvement is accepted, False once it is
+        rejected, and None while more games are needed. No decision is made
+        before the given number of games, as the variance is estimated.
+        """
+
+        if self.count < minimum:
+            return None
+
+        lower, upper = self.bounds
+        llr = self.llr
+        if llr >= upper:
+            return True
+        if llr <= lower:
+            return False
+        return None
+
+
+def interval(values, confidence=0.95):
+    """
+    Returns the mean of the values and the half-width of its confidence
+    interval, by the normal approximation.
+    """
+
+    count = len(values)
+    mean = sum(values) / count
+    if count < 2:
+        return mean, float('inf')
+
+    variance = sum((value - mean) ** 2 for value in values) / (count - 1)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    return mean, z * sqrt(variance / count)
+
+
+parser = argparse.ArgumentParser(
+    description='Compare two MyPlayer configurations on paired seeds, '
+                'playing games until a sequential test decides'
+)
+parser.add_argument(
+    '--a',
+    nargs='*',
+    default=[],
+    type=setting,
+    metavar='NAME=VALUE',
+    help='Settings of the baseline player'
+)
+parser.add_argument(
+    '--b',
+    nargs='*',
+    default=[],
+    type=setting,
+    metavar='NAME=VALUE',
+    help='Settings of the candidate player'
+)
+parser.add_argument(
+    '--margin',
+    default=100,
+    type=float,
+    help='Smallest mean score improvement worth detecting'
+)
+parser.add_argument('--alpha', default=0.05, type=float)
+parser.add_argument('--beta', default=0.05, type=float)
+parser.add_argument(
+    '--min-games',
+    default=8,
+    type=int,
+    help='Pairs of games played before the test may decide'
+)
+parser.add_argument(
+    '--max-games',
+    default=200,
+    type=int,
+    help='Pairs of games after which to give up without a decision'
+)
+parser.add_argument('--seed', default=DEFAULT_SEED, type=int)
+parser.add_argument('--blocks', default=BLOCK_LIMIT, type=int)
+parser.add_argument('--width', default=BOARD_WIDTH, type=int)
+parser.add_argument('--height', default=BOARD_HEIGHT, type=int)
+parser.add_argument(
+    '--adversary',
+    default='random',
+    choices=sorted(adversaries)
+)
+parser.add_argument(
+    '--workers',
+    default=None,
+    type=int,
+    help='Processes to play games in'
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    test = SequentialTest(args.margin, args.alpha, args.beta)
+
+    def submit(executor, seed):
+        return [
+            executor.submit(
+                play_game,
+                seed,
+                settings,
+                args.adversary,
+                args.blocks,
+                args.width,
+                args.height
+            )
+            for settings in (args.a, args.b)
+        ]
+
+    start = time.monotonic()
+    scores = ([], [])
+    decision = None
+    with ProcessPoolExecutor(args.workers) as executor:
+        # Keep every process busy with games ahead of the ones the test is
+        # waiting for, but take results in seed order so the games played
+        # do not depend on which finish first.
+        seeds = iter(range(args.seed, args.seed + args.max_games))
+        queue = []
+        for seed in islice(seeds, args.workers or os.cpu_count()):
+            queue.append((seed, submit(executor, seed)))
+
+        while queue and decision is None:
+            seed, futures = queue.pop(0)
+            a, b = (future.result() for future in futures)
+            scores[0].append(a)
+            scores[1].append(b)
+            test.add(b - a)
+
+            lower, upper = test.bounds
+            print(
+                f'seed {seed}: {a} vs {b}, llr {test.llr:.2f} '
+                f'({lower:.2f}, {upper:.2f})',
+                flush=True
+            )
+
+            decision = test.decision(args.min_games)
+            seed = next(seeds, None)
+            if seed is not None:
+                queue.append((seed, submit(executor, seed)))
+
+        for _, futures in queue:
+            for future in futures:
+                future.cancel()
+
+    elapsed = time.monotonic() - start
+    for name, values in zip('ab', scores):
+        mean, width = interval(values)
+        print(f'{name}: mean score {mean:.0f} ± {width:.0f}')
+    mean, width = interval([b - a for a, b in zip(*scores)])
+    print(f'b - a: {mean:.0f} ± {width:.0f} over {test.count} pairs')
+
+    if decision is None:
+        verdict = 'undecided'
+    elif decision:
+        verdict = f'b improves on a by at least {args.margin:g}'
+    else:
+        verdict = f'b does not improve on a by {args.margin:g}'
+    print(f'{verdict} after {elapsed:.1f}s')
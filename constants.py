@@ -8,3 +8,7 @@ BLOCK_LIMIT = 400
 INTERVAL = 1000
 
 PREFIX = '<TETRIS WIRE PROTOCOL>'
+
+RENDER_FPS = 30
+
+LOG_CAPACITY = 4096
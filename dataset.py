@@ -0,0 +1,177 @@
+from board import Shape
+
+import json
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+
+MANIFEST = 'manifest.json'
+SHARD_SIZE = 1 << 18
+
+# Rows written between updates of the manifest, bounding what a crash loses.
+FLUSH_ROWS = 1 << 12
+
+SHAPES = list(Shape)
+
+
+def sample_dtype(width, height):
+    """
+    One training sample: the color plane of the board before the decision
+    (shape indices as in board.Board, zero for empty), the falling and next
+    shapes (-1 if none), the placement chosen, the row the block landed in,
+    and what it led to.
+
+    The placement is the rotation and move of MyPlayer.generate_moves. A
+    block that was tucked in under the stack rather than dropped lands
+    somewhere dropping it cannot reach; its placement is that of the column
+    it landed in, and the row tells the two apart.
+    """
+
+    return np.dtype([
+        ('grid', np.int8, (height, width)),
+        ('falling', np.int8),
+        ('next', np.int8),
+        ('rotation', np.int8),
+        ('move', np.int8),
+        ('row', np.int16),
+        ('score', np.int64),
+        ('lines', np.int8),
+    ])
+
+
+class ShardWriter:
+    """
+    Appends samples to fixed-size memory-mapped .npy shards in a directory,
+    starting a new shard whenever one fills up. Shards that were written are
+    never touched again; the manifest lists them together with the number of
+    samples each holds, and is replaced atomically whenever that changes.
+
+    A shard is listed as soon as it is created, and its row count is brought
+    up to date every flush_rows rows (after the rows themselves are flushed),
+    so a crash loses at most that many rows and a later writer never reuses
+    the file of a shard that was cut short.
+    """
+
+    directory = None
+    width = None
+    height = None
+    shard_size = None
+
+    def __init__(self, directory, width, height, shard_size=SHARD_SIZE,
+                 flush_rows=FLUSH_ROWS):
+        self.directory = directory
+        self.width = width
+        self.height = height
+        self.shard_size = shard_size
+        self.flush_rows = flush_rows
+        self.dtype = sample_dtype(width, height)
+
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = read_manifest(directory) or {
+            'width': width,
+            'height': height,
+            'shard_size': shard_size,
+            'shards': [],
+        }
+        if (self.manifest['width'], self.manifest['height']) != (width, height):
+            raise ValueError('Existing shards are for another board size')
+
+        self.shard = None
+        self.rows = 0
+
+    def open_shard(self):
+        name = f'shard-{len(self.manifest["shards"]):05d}.npy'
+        self.shard = open_memmap(
+            os.path.join(self.directory, name),
+            mode='w+',
+            dtype=self.dtype,
+            shape=(self.shard_size,)
+        )
+        self.rows = 0
+        self.manifest['shards'].append({'file': name, 'rows': 0})
+        write_manifest(self.directory, self.manifest)
+
+    def flush(self):
+        """
+        Makes the rows written so far durable and lists them in the manifest.
+        """
+
+        if self.shard is None:
+            return
+        self.shard.flush()
+        self.manifest['shards'][-1]['rows'] = self.rows
+        write_manifest(self.directory, self.manifest)
+
+    def close_shard(self):
+        self.flush()
+        self.shard = None
+
+    def record(self, board, rotation, move, row, score, lines):
+        """
+        Appends a decision made on the given board.
+        """
+
+        if self.shard is None:
+            self.open_shard()
+
+        shard = self.shard
+        index = self.rows
+        shard['grid'][index] = np.frombuffer(board.colors, np.int8).reshape(
+            self.height,
+            self.width
+        )
+        shard['falling'][index] = shape_number(board.falling)
+        shard['next'][index] = shape_number(board.next)
+        shard['rotation'][index] = rotation
+        shard['move'][index] = move
+        shard['row'][index] = row
+        shard['score'][index] = score
+        shard['lines'][index] = lines
+        self.rows += 1
+
+        if self.rows == self.shard_size:
+            self.close_shard()
+        elif self.rows % self.flush_rows == 0:
+            self.flush()
+
+    def close(self):
+        self.close_shard()
+
+
+def shape_number(block):
+    return -1 if block is None else SHAPES.index(block.shape)
+
+
+def read_manifest(directory):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    with open(path + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def read_shards(directory):
+    """
+    Yields the samples of every shard listed in the manifest as read-only
+    memory-mapped arrays.
+    """
+
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return
+
+    for shard in manifest['shards']:
+        samples = np.load(
+            os.path.join(directory, shard['file']),
+            mmap_mode='r'
+        )
+        yield samples[:shard['rows']]
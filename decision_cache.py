@@ -0,0 +1,169 @@
+from board import Shape
+from features import column_heights, row_masks
+from hashlib import blake2b
+
+import mmap
+import os
+import struct
+
+
+# Header: magic, version, board width and height, number of slots, number of
+# slots in use.
+HEADER = struct.Struct('<4sHHHII')
+MAGIC = b'TTDC'
+VERSION = 1
+
+# Record: hashed key (zero for an empty slot), rotation and horizontal move.
+RECORD = struct.Struct('<Qbb6x')
+
+# Relative column heights are clipped to this, so that deep wells and tall
+# towers look the same no matter how extreme they are.
+MAX_PROFILE = 15
+
+SHAPES = list(Shape)
+
+
+def surface_key(board, danger=False):
+    """
+    Hashes what a decision mostly depends on: column heights relative to the
+    lowest column, the falling and next shapes, and whether the player was
+    playing for survival. Never returns zero.
+    """
+
+    heights = column_heights(row_masks(board), board.height, board.width)
+    lowest = min(heights)
+    profile = bytes(min(h - lowest, MAX_PROFILE) for h in heights)
+
+    shapes = bytes([
+        SHAPES.index(board.falling.shape) if board.falling else 255,
+        SHAPES.index(board.next.shape) if board.next else 255,
+        danger,
+    ])
+
+    digest = blake2b(profile + shapes, digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+class DecisionCache:
+    """
+    A fixed-size open-addressing hash table of decisions stored in a file and
+    accessed through mmap, so opening it costs nothing and lookups only touch
+    the pages they need.
+    """
+
+    width = None
+    height = None
+    capacity = None
+
+    def __init__(self, buffer, file=None):
+        self.buffer = buffer
+        self.file = file
+
+        magic, version, width, height, capacity, count = HEADER.unpack_from(
+            buffer
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a decision cache')
+
+        self.width = width
+        self.height = height
+        self.capacity = capacity
+        self.count = count
+
+    @classmethod
+    def open(cls, path):
+        """
+        Maps an existing cache file read-only.
+        """
+
+        file = open(path, 'rb')
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer, file)
+
+    @classmethod
+    def create(cls, path, width, height, capacity):
+        """
+        Creates an empty cache file with the given number of slots and maps
+        it for writing.
+        """
+
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, width, height, capacity, 0))
+            file.truncate(HEADER.size + capacity * RECORD.size)
+
+        file = open(path, 'r+b')
+        buffer = mmap.mmap(file.fileno(), 0)
+        return cls(buffer, file)
+
+    def close(self):
+        self.buffer.close()
+        if self.file is not None:
+            self.file.close()
+
+    def slots(self, key):
+        """
+        Yields the offsets of the slots to probe for a key, in order.
+        """
+
+        slot = key % self.capacity
+        for _ in range(self.capacity):
+            yield HEADER.size + slot * RECORD.size
+            slot = (slot + 1) % self.capacity
+
+    def get(self, key):
+        """
+        Returns the (rotation, move) stored for a key, or None.
+        """
+
+        for offset in self.slots(key):
+            found, rotation, move = RECORD.unpack_from(self.buffer, offset)
+            if found == key:
+                return rotation, move
+            if found == 0:
+                return None
+        return None
+
+    def put(self, key, rotation, move):
+        """
+        Stores a decision unless one is already stored for the key. Returns
+        False if the table is full.
+        """
+
+        for offset in self.slots(key):
+            found, _, _ = RECORD.unpack_from(self.buffer, offset)
+            if found == key:
+                return True
+            if found == 0:
+                RECORD.pack_into(self.buffer, offset, key, rotation, move)
+                self.count += 1
+                HEADER.pack_into(
+                    self.buffer,
+                    0,
+                    MAGIC,
+                    VERSION,
+                    self.width,
+                    self.height,
+                    self.capacity,
+                    self.count
+                )
+                return True
+        return False
+
+    def lookup(self, board, danger=False):
+        """
+        Returns the cached (rotation, move) for a board, or None.
+        """
+
+        if board.width != self.width or board.height != self.height:
+            return None
+        return self.get(surface_key(board, danger))
+
+
+def open_cache(path):
+    """
+    Opens the cache at the given path, or returns None if there is none.
+    """
+
+    if path and os.path.exists(path):
+        return DecisionCache.open(path)
+    return None
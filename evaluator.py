@@ -0,0 +1,170 @@
+from board import Shape, shape_rotations
+from features import features_from_rows, row_masks
+from functools import lru_cache
+from operator import sub
+
+
+@lru_cache(maxsize=None)
+def orientations(shape):
+    """
+    Returns the distinct orientations of a shape, in the order of
+    board.shape_rotations.
+    """
+
+    result = []
+    for orientation in shape_rotations(shape)[0]:
+        if all(orientation.masks != other.masks for other in result):
+            result.append(orientation)
+    return tuple(result)
+
+
+class PlacementEvaluator:
+    """
+    Scores every placement of a shape that can be reached by hard dropping
+    it from above the stack, working directly on row bitmasks. Placements
+    that do not clear lines are scored incrementally from the column heights
+    and holes of the board; the rest are scored from scratch.
+
+    The default weights are those from the article referenced in player.py.
+    """
+
+    width = None
+    height = None
+
+    height_weight = -0.510066
+    lines_weight = 0.760666
+    holes_weight = -0.35663
+    bumpiness_weight = -0.184483
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.full = (1 << width) - 1
+
+    def score(self, height, lines, holes, bumpiness):
+        return (
+            self.height_weight * height +
+            self.lines_weight * lines +
+            self.holes_weight * holes +
+            self.bumpiness_weight * bumpiness
+        )
+
+    def placements(self, rows, shape, features=None):
+        """
+        Returns (score, orientation, x) for every placement of the shape on a
+        board given as row bitmasks. Placements that would stick out of the
+        top of the board are left out.
+        """
+
+        width = self.width
+        height = self.height
+        if features is None:
+            features = features_from_rows(rows, width, height)
+        heights = features.heights
+        surface = [height - h for h in heights]
+        gaps = [self.full ^ row for row in rows]
+
+        height_weight = self.height_weight
+        holes_weight = self.holes_weight
+        bumpiness_weight = self.bumpiness_weight
+        base = (
+            height_weight * features.height +
+            holes_weight * features.holes +
+            bumpiness_weight * features.bumpiness
+        )
+
+        result = []
+        for index, orientation in enumerate(orientations(shape)):
+            masks = orientation.masks
+            bottoms = orientation.bottoms
+            tops = orientation.tops
+            size = orientation.width
+            # Used to count the holes left underneath the block after a drop.
+            depth = sum(bottoms)
+
+            for x in range(width - size + 1):
+                below = surface[x:x + size]
+
+                # The block comes to rest on the first column it touches.
+                y = min(map(sub, below, bottoms)) - 1
+                if y < 0:
+                    continue
+
+                # Rows are completed when the block fills all their gaps.
+                if any(
+                    gaps[y + dy] == mask << x for dy, mask in enumerate(masks)
+                ):
+                    result.append(
+                        (self.score_cleared(rows, orientation, x, y), index, x)
+                    )
+                    continue
+
+                # Only the columns under the block and their neighbours
+                # change; update the features for those alone.
+                top = height - y
+                new = [top - offset for offset in tops]
+                holes = sum(below) - depth - size * (y + 1)
+
+                first = x - 1 if x else 0
+                last = x + size if x + size < width else width - 1
+                changed = heights[first:last + 1]
+                bumps = 0
+                for i in range(len(changed) - 1):
+                    bumps -= abs(changed[i] - changed[i+1])
+                changed[x - first:x - first + size] = new
+                for i in range(len(changed) - 1):
+                    bumps += abs(changed[i] - changed[i+1])
+
+                result.append((
+                    base +
+                    height_weight * (sum(new) - sum(heights[x:x + size])) +
+                    holes_weight * holes +
+                    bumpiness_weight * bumps,
+                    index,
+                    x
+                ))
+
+        return result
+
+    def score_cleared(self, rows, orientation, x, y):
+        """
+        Places a block that completes lines and scores the resulting board.
+        """
+
+        rows = list(rows)
+        for dy, mask in enumerate(orientation.masks):
+            rows[y + dy] |= mask << x
+
+        kept = [row for row in rows if row != self.full]
+        lines = len(rows) - len(kept)
+        rows = [0] * lines + kept
+
+        features = features_from_rows(rows, self.width, self.height)
+        return self.score(
+            features.height,
+            lines,
+            features.holes,
+            features.bumpiness
+        )
+
+    def best(self, rows, shape, features=None):
+        """
+        Returns the best (score, orientation, x) for a shape, or None if the
+        shape cannot be placed at all.
+        """
+
+        return max(self.placements(rows, shape, features), default=None)
+
+    def best_replies(self, board):
+        """
+        Returns the score of the best placement of every shape on a board,
+        or None for shapes that cannot be placed.
+        """
+
+        rows = row_masks(board)
+        features = features_from_rows(rows, self.width, self.height)
+        replies = {}
+        for shape in Shape:
+            best = self.best(rows, shape, features)
+            replies[shape] = None if best is None else best[0]
+        return replies
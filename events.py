@@ -0,0 +1,129 @@
+class Event:
+    """
+    Base class for everything a board reports to its subscribers.
+    """
+
+    def __repr__(self):
+        fields = ', '.join(
+            f'{name}={value!r}' for name, value in vars(self).items()
+        )
+        return f'{type(self).__name__}({fields})'
+
+
+class BlockChosen(Event):
+    """
+    The adversary chose the next block, which starts falling once the one
+    falling now has landed.
+    """
+
+    shape = None
+
+    def __init__(self, shape):
+        self.shape = shape
+
+
+class ActionTaken(Event):
+    """
+    An action was taken on the falling block, whether or not it could be
+    carried out: a direction, a rotation, or None for a skip. Reported
+    before the events it caused.
+    """
+
+    action = None
+
+    def __init__(self, action):
+        self.action = action
+
+
+class BlockSpawned(Event):
+    """
+    A block started falling from the top of the board.
+    """
+
+    shape = None
+    cells = None
+
+    def __init__(self, shape, cells):
+        self.shape = shape
+        self.cells = cells
+
+
+class BlockMoved(Event):
+    """
+    The falling block moved, either as asked or by the implicit move down.
+    Not reported for moves that were blocked.
+    """
+
+    direction = None
+    cells = None
+
+    def __init__(self, direction, cells):
+        self.direction = direction
+        self.cells = cells
+
+
+class BlockRotated(Event):
+    """
+    The falling block rotated. Not reported for rotations that failed.
+    """
+
+    rotation = None
+    cells = None
+
+    def __init__(self, rotation, cells):
+        self.rotation = rotation
+        self.cells = cells
+
+
+class LinesCleared(Event):
+    """
+    Full rows were removed, given by their index before any was removed.
+    """
+
+    rows = None
+
+    def __init__(self, rows):
+        self.rows = rows
+
+
+class BlockLanded(Event):
+    """
+    The falling block became part of the board, and any rows it completed
+    were cleared (the number of which is given as lines).
+    """
+
+    shape = None
+    cells = None
+    lines = None
+
+    def __init__(self, shape, cells, lines):
+        self.shape = shape
+        self.cells = cells
+        self.lines = lines
+
+
+class ScoreChanged(Event):
+    """
+    The score changed by an action: for rows dropped and lines cleared.
+    """
+
+    score = None
+    gained = None
+
+    def __init__(self, score, gained):
+        self.score = score
+        self.gained = gained
+
+
+class GameOver(Event):
+    """
+    The game ended, won if the adversary ran out of blocks and lost if a
+    new block had no space.
+    """
+
+    score = None
+    won = None
+
+    def __init__(self, score, won):
+        self.score = score
+        self.won = won
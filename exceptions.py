@@ -9,3 +9,14 @@ class BlockLimitException(Exception):
 class NoBlockException(Exception):
     def __init__(self):
         super().__init__("This board has no block to manipulate.")
+
+
+class ReadOnlyBoardException(Exception):
+    def __init__(self, name):
+        super().__init__(
+            f"Cannot change the board through a view ({name}); clone it first."
+        )
+
+
+class GameOverException(Exception):
+    pass
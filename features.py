@@ -0,0 +1,223 @@
+from functools import lru_cache
+
+
+# Rows up to this wide get lookup tables indexed by the whole row; wider rows
+# are looked up in chunks of this many bits.
+TABLE_BITS = 12
+
+
+def row_masks(board):
+    """
+    Returns the occupied cells of a board as one bitmask per row, with bit x
+    set when (x, y) is occupied. These are the masks the board keeps cached,
+    so they must not be changed.
+    """
+
+    return board.row_masks()
+
+
+@lru_cache(maxsize=None)
+def popcount_table(bits):
+    """
+    Number of set bits of every value that fits in the given number of bits.
+    """
+
+    table = [0] * (1 << bits)
+    for value in range(1, 1 << bits):
+        table[value] = table[value >> 1] + (value & 1)
+    return table
+
+
+@lru_cache(maxsize=None)
+def transition_table(width):
+    """
+    Number of changes between filled and empty cells along every possible
+    row of the given width, counting the walls on both sides as filled.
+    """
+
+    popcount = popcount_table(width + 1)
+    wall = 1 << (width + 1)
+    table = [0] * (1 << width)
+    for row in range(1 << width):
+        walled = 1 | (row << 1) | wall
+        table[row] = popcount[(walled ^ (walled >> 1)) & (wall - 1)]
+    return table
+
+
+class Tables:
+    """
+    Precomputed per-row lookups for boards of a fixed width.
+    """
+
+    width = None
+    full = None
+
+    def __init__(self, width):
+        self.width = width
+        self.full = (1 << width) - 1
+
+        if width <= TABLE_BITS:
+            self.popcount_row = popcount_table(width).__getitem__
+            self.transitions = transition_table(width).__getitem__
+        else:
+            chunk = popcount_table(TABLE_BITS)
+            mask = (1 << TABLE_BITS) - 1
+
+            def popcount(value):
+                count = 0
+                while value:
+                    count += chunk[value & mask]
+                    value >>= TABLE_BITS
+                return count
+
+            wall = 1 << (width + 1)
+
+            def transitions(row):
+                walled = 1 | (row << 1) | wall
+                return popcount((walled ^ (walled >> 1)) & (wall - 1))
+
+            self.popcount_row = popcount
+            self.transitions = transitions
+
+
+@lru_cache(maxsize=None)
+def tables(width):
+    return Tables(width)
+
+
+def bits(mask):
+    """
+    Yields the positions of the set bits of a mask, lowest first.
+    """
+
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Features:
+    """
+    Board features used by heuristic players:
+
+    heights: height of the highest occupied cell of every column
+    height: sum of the column heights
+    max_height: height of the highest column
+    holes: empty cells below the top of their column
+    column_holes: holes in every column
+    row_transitions: changes between empty and filled cells along rows
+    column_transitions: changes between empty and filled cells along columns
+    wells: empty cells with both neighbours filled, above the stack
+    bumpiness: sum of height differences between neighbouring columns
+    """
+
+    heights = None
+    height = None
+    max_height = None
+    holes = None
+    column_holes = None
+    row_transitions = None
+    column_transitions = None
+    wells = None
+    bumpiness = None
+
+
+def column_heights(rows, height, width):
+    """
+    Returns the height of every column, from rows given top to bottom.
+    """
+
+    heights = [0] * width
+    seen = 0
+    for y, row in enumerate(rows):
+        new = row & ~seen
+        if new:
+            for x in bits(new):
+                heights[x] = height - y
+            seen |= row
+    return heights
+
+
+def extract_features(board):
+    """
+    Computes all features of a board in one pass over its rows.
+    """
+
+    return features_from_rows(row_masks(board), board.width, board.height)
+
+
+def features_from_rows(rows, width, height):
+    """
+    Computes all features of a board given as row bitmasks, top to bottom.
+    """
+
+    table = tables(width)
+    full = table.full
+    popcount = table.popcount_row
+    transitions = table.transitions
+    left_wall = 1
+    right_wall = 1 << (width - 1)
+
+    heights = [0] * width
+    column_holes = [0] * width
+    holes = 0
+    row_transitions = 0
+    column_transitions = 0
+    wells = 0
+
+    # Empty rows above the stack only count towards the transitions along
+    # rows (and towards the wells, on boards one column wide); count them in
+    # one go rather than walking them.
+    top = 0
+    for row in rows:
+        if row:
+            break
+        top += 1
+    row_transitions += top * transitions(0)
+    wells += top * popcount(full & left_wall & right_wall)
+
+    covered = 0
+    above = 0
+    for y in range(top, len(rows)):
+        row = rows[y]
+        row_transitions += transitions(row)
+        column_transitions += popcount(row ^ above)
+
+        # Cells covered by something higher up but empty are holes.
+        hidden = covered & ~row
+        if hidden:
+            holes += popcount(hidden)
+            for x in bits(hidden):
+                column_holes[x] += 1
+
+        # Uncovered empty cells enclosed on both sides are part of a well.
+        open_cells = full & ~row & ~covered
+        if open_cells:
+            left = (row << 1) | left_wall
+            right = (row >> 1) | right_wall
+            wells += popcount(open_cells & left & right)
+
+        new = row & ~covered
+        if new:
+            for x in bits(new):
+                heights[x] = height - y
+            covered |= row
+
+        above = row
+
+    # The floor counts as filled.
+    column_transitions += popcount(full & ~above)
+
+    features = Features()
+    features.heights = heights
+    features.height = sum(heights)
+    features.max_height = max(heights)
+    features.holes = holes
+    features.column_holes = column_holes
+    features.row_transitions = row_transitions
+    features.column_transitions = column_transitions
+    features.wells = wells
+    features.bumpiness = sum(
+        abs(heights[x] - heights[x+1]) for x in range(width - 1)
+    )
+    return features
@@ -0,0 +1,390 @@
+from board import Direction, Rotation, Shape, index_to_shape, shape_to_color
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from reachability import perform
+from snapshot import decode, encode
+
+import argparse
+import board as engine
+import reference_board
+import time
+
+
+ACTIONS = [
+    None,
+    Direction.Left,
+    Direction.Right,
+    Direction.Down,
+    Direction.Drop,
+    Rotation.Clockwise,
+    Rotation.Anticlockwise,
+]
+
+SHAPES = list(Shape)
+
+# Garbage cells are empty one time in five, and of any shape otherwise.
+GARBAGE = range(len(SHAPES) + 1)
+GARBAGE_WEIGHTS = [0.2 * len(SHAPES)] + [0.8] * len(SHAPES)
+
+# The index of every color in a color plane.
+COLOR_INDICES = {
+    shape_to_color[shape]: index
+    for index, shape in enumerate(index_to_shape) if shape
+}
+
+
+class Case:
+    """
+    One fuzzing input: a board size, rows of garbage to start with, the
+    shapes handed out in order and the actions made, in order. Actions that
+    remain when the shapes run out or the game ends are ignored.
+    """
+
+    width = None
+    height = None
+    garbage = None
+    shapes = None
+    actions = None
+
+    def __init__(self, width, height, garbage, shapes, actions):
+        self.width = width
+        self.height = height
+        self.garbage = garbage
+        self.shapes = shapes
+        self.actions = actions
+
+    @classmethod
+    def generate(cls, random):
+        width = random.randint(4, 12)
+        height = random.randint(4, 24)
+
+        # Some mostly full rows at the bottom, so lines get cleared early.
+        # Each has a hole, as full rows never stay on the board in a game.
+        garbage = []
+        for _ in range(random.randint(0, height // 2)):
+            row = random.choices(GARBAGE, GARBAGE_WEIGHTS, k=width)
+            row[random.randrange(width)] = 0
+            garbage.append(row)
+
+        shapes = random.choices(SHAPES, k=random.randint(1, 40))
+        actions = random.choices(ACTIONS, k=random.randint(1, 400))
+        return cls(width, height, garbage, shapes, actions)
+
+    def board(self, module=engine):
+        """
+        Returns the board the case starts with, of the engine in the given
+        module.
+        """
+
+        board = module.Board(self.width, self.height)
+        cells = set()
+        for i, row in enumerate(self.garbage):
+            y = self.height - len(self.garbage) + i
+            for x, color in enumerate(row):
+                if color:
+                    cells.add((x, y))
+                    if module is reference_board:
+                        shape = SHAPES[color - 1]
+                        board.cellcolor[(x, y)] = shape_to_color[shape]
+                    else:
+                        board.colors[y * self.width + x] = color
+        # Replaced rather than changed, as board.Board keeps them frozen.
+        board.cells = board.cells | cells
+        return board
+
+    def __repr__(self):
+        actions = [
+            'SKIP' if action is None else action.value
+            for action in self.actions
+        ]
+        return (
+            f'Case({self.width}, {self.height}, {self.garbage!r}, '
+            f'{[shape.value for shape in self.shapes]!r}, {actions!r})'
+        )
+
+
+def colors(board):
+    """
+    The color plane of a board. The reference engine keeps the color of
+    every cell in a dict instead, from which the plane is made.
+    """
+
+    if not isinstance(board, reference_board.Board):
+        return bytes(board.colors)
+
+    width = board.width
+    plane = bytearray(width * board.height)
+    for (x, y), color in board.cellcolor.items():
+        plane[y * width + x] = COLOR_INDICES[color]
+    return plane
+
+
+def observe(board):
+    """
+    Everything about a board that engines have to agree on. Cells are
+    compared as they are, a set in the reference engine and a frozenset in
+    board.Board, as the observation is only compared before the next step.
+    """
+
+    falling = None
+    if board.falling is not None:
+        falling = frozenset(board.falling.cells), board.falling.center
+
+    return (
+        board.cells,
+        board.score,
+        falling,
+        board.alive,
+        colors(board),
+    )
+
+
+def reference_step(board, action):
+    """
+    Steps a board of the reference engine, which has enums of its own.
+    """
+
+    if action is None:
+        board.skip()
+    elif isinstance(action, Direction):
+        board.move(reference_board.Direction(action.value))
+    else:
+        board.rotate(reference_board.Rotation(action.value))
+    return board
+
+
+def board_step(board, action):
+    perform(board, [action])
+    return board
+
+
+def snapshot_step(board, action):
+    """
+    Steps a board that is encoded and decoded again before every action.
+    """
+
+    board = decode(encode(board))
+    perform(board, [action])
+    return board
+
+
+def clone_step(board, action):
+    """
+    Steps a clone of the board, checking that clones share nothing they
+    should not.
+    """
+
+    board = board.clone()
+    perform(board, [action])
+    return board
+
+
+candidates = {
+    'board': board_step,
+    'snapshot': snapshot_step,
+    'clone': clone_step,
+}
+
+
+def run(case, step):
+    """
+    Plays a case on the reference engine and, with the given step function,
+    on board.Board side by side. Returns the number of actions made and
+    whether the engines differed after the last of them (zero actions if
+    the starting positions already differ).
+    """
+
+    shapes = iter(case.shapes)
+    reference = case.board(reference_board)
+    candidate = case.board()
+
+    def next_block(board, shape, module=engine):
+        board.next = module.Block(module.Shape(shape.value))
+        if board.falling is None:
+            board.place_next_block()
+
+    # Like Board.run, keep one falling and one next block.
+    for _ in range(2):
+        shape = next(shapes, None)
+        if shape is None:
+            break
+        next_block(reference, shape, reference_board)
+        next_block(candidate, shape)
+
+    if observe(reference) != observe(candidate):
+        return 0, True
+
+    for count, action in enumerate(case.actions, 1):
+        if reference.falling is None or not reference.alive:
+            return count - 1, False
+
+        # Engines have to fail the same way, too.
+        try:
+            reference = reference_step(reference, action)
+        except Exception as error:
+            try:
+                step(candidate, action)
+            except Exception as other:
+                # The engines each have their own exceptions, too.
+                return count, type(other).__name__ != type(error).__name__
+            return count, True
+        candidate = step(candidate, action)
+
+        if reference.next is None:
+            shape = next(shapes, None)
+            if shape is not None:
+                next_block(reference, shape, reference_board)
+                next_block(candidate, shape)
+
+        if observe(reference) != observe(candidate):
+            return count, True
+
+    return len(case.actions), False
+
+
+def shrink(case, step):
+    """
+    Makes a diverging case as small as possible while it keeps diverging:
+    drops actions and shapes that are not needed, simplifies the remaining
+    actions to skips, and removes garbage rows and cells.
+    """
+
+    def fails(candidate):
+        return run(candidate, step)[1]
+
+    def copy(**changes):
+        fields = dict(
+            width=case.width,
+            height=case.height,
+            garbage=case.garbage,
+            shapes=case.shapes,
+            actions=case.actions,
+        )
+        fields.update(changes)
+        return Case(**fields)
+
+    # Nothing after the divergence matters.
+    count, _ = run(case, step)
+    case = copy(actions=case.actions[:count])
+
+    changed = True
+    while changed:
+        changed = False
+
+        for field in ('actions', 'shapes', 'garbage'):
+            # Remove chunks, halving their size whenever none can go.
+            items = getattr(case, field)
+            size = len(items) // 2 or 1
+            while size and items:
+                start = 0
+                while start < len(items):
+                    smaller = items[:start] + items[start + size:]
+                    candidate = copy(**{field: smaller})
+                    if fails(candidate):
+                        case, items, changed = candidate, smaller, True
+                    else:
+                        start += size
+                size //= 2
+
+        for i, action in enumerate(case.actions):
+            if action is not None:
+                actions = list(case.actions)
+                actions[i] = None
+                candidate = copy(actions=actions)
+                if fails(candidate):
+                    case, changed = candidate, True
+
+        for i, row in enumerate(case.garbage):
+            for x, color in enumerate(row):
+                if color:
+                    garbage = [list(row) for row in case.garbage]
+                    garbage[i][x] = 0
+                    candidate = copy(garbage=garbage)
+                    if fails(candidate):
+                        case, changed = candidate, True
+
+    return case
+
+
+def fuzz(step, seed, seconds, report=print):
+    """
+    Runs random cases until one diverges or time runs out. Returns the
+    shrunk diverging case, or None.
+
+    One process gets through about a thousand cases, some twenty thousand
+    actions, a second: most of the time goes into stepping the set-based
+    reference engine, which is as slow as it always was, and comparing both
+    boards after every action. More seeds can be fuzzed at once in
+    processes of their own.
+    """
+
+    random = Random(seed)
+    end = time.monotonic() + seconds
+    cases = actions = 0
+
+    while time.monotonic() < end:
+        case = Case.generate(random)
+        made, diverged = run(case, step)
+        cases += 1
+        actions += made
+
+        if diverged:
+            report(f'divergence after {cases} cases, shrinking')
+            return shrink(case, step)
+
+    report(f'{cases} cases, {actions} actions, no divergence')
+    return None
+
+
+def fuzz_seed(candidate, seed, seconds):
+    """
+    Fuzzes the named candidate from one seed, in a worker process.
+    """
+
+    def report(message):
+        print(f'seed {seed}: {message}', flush=True)
+
+    return fuzz(candidates[candidate], seed, seconds, report)
+
+
+parser = argparse.ArgumentParser(
+    description='Compare board.Board, as stepped by a candidate, with the '
+                'original set-based engine on random games'
+)
+parser.add_argument(
+    '--candidate',
+    default='board',
+    choices=sorted(candidates)
+)
+parser.add_argument('--seed', default=0, type=int)
+parser.add_argument('--seconds', default=60, type=float)
+parser.add_argument(
+    '--workers',
+    default=1,
+    type=int,
+    help='Processes to fuzz in, each from a seed of its own counting up '
+         'from --seed'
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.workers > 1:
+        with ProcessPoolExecutor(args.workers) as executor:
+            futures = [
+                executor.submit(
+                    fuzz_seed,
+                    args.candidate,
+                    args.seed + i,
+                    args.seconds
+                )
+                for i in range(args.workers)
+            ]
+            found = [future.result() for future in futures]
+        case = next((case for case in found if case is not None), None)
+    else:
+        case = fuzz(candidates[args.candidate], args.seed, args.seconds)
+
+    if case is not None:
+        print(case)
+        raise SystemExit(1)
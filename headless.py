@@ -0,0 +1,248 @@
+from adversary import adversaries
+from arguments import milliseconds
+from board import Board, Shape
+from constants import BOARD_HEIGHT, BOARD_WIDTH, BLOCK_LIMIT, DEFAULT_SEED
+from exceptions import BlockLimitException
+from player import Player, SelectedPlayer
+
+import argparse
+import os
+import subprocess
+import time
+
+
+def play(board, player, adversary):
+    """
+    Plays a game to the end without displaying it. Returns True if the
+    player survived until the adversary ran out of blocks.
+    """
+
+    try:
+        for move in board.run(player, adversary):
+            pass
+    except BlockLimitException:
+        return True
+
+    return False
+
+
+def resident_memory():
+    """
+    Returns the resident set size of this process in bytes, as read from
+    /proc or, where there is none (such as on macOS), as reported by ps.
+    """
+
+    try:
+        with open('/proc/self/statm') as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Unlike getrusage, which only knows the peak (and counts it in
+        # bytes on macOS but in KiB elsewhere), ps reports the current size,
+        # in KiB everywhere.
+        output = subprocess.run(
+            ['ps', '-o', 'rss=', '-p', str(os.getpid())],
+            capture_output=True,
+            check=True,
+            universal_newlines=True
+        ).stdout
+        return int(output) * 1024
+
+
+class CountingPlayer(Player):
+    """
+    Passes the decisions of another player on, counting them.
+    """
+
+    player = None
+    decisions = None
+
+    def __init__(self, player):
+        self.player = player
+        self.decisions = 0
+
+    def choose_action(self, board):
+        self.decisions += 1
+        return self.player.choose_action(board)
+
+
+def soak(board, player, adversary, duration=None, interval=10,
+         max_growth=None, report=print):
+    """
+    Plays a game until the player dies or the duration (in seconds) runs
+    out, reporting blocks and decisions per second over the last interval
+    and the resident memory every interval seconds, and once more when the
+    duration runs out.
+
+    The memory after the first interval is taken as the baseline; if given,
+    it may not grow by more than max_growth bytes beyond that at any later
+    report. Returns the number of blocks played.
+    """
+
+    player = CountingPlayer(player)
+    start = last = time.monotonic()
+    blocks = reported_blocks = reported_decisions = 0
+    baseline = None
+
+    try:
+        for move in board.run(player, adversary):
+            if isinstance(move, Shape):
+                blocks += 1
+
+            now = time.monotonic()
+            done = duration is not None and now - start >= duration
+            if now - last < interval and not done:
+                continue
+
+            memory = resident_memory()
+            if baseline is None:
+                baseline = memory
+            report(
+                f'{now - start:.0f}s: {blocks} blocks, score {board.score}, '
+                f'{(blocks - reported_blocks) / (now - last):.1f} blocks/s, '
+                f'{(player.decisions - reported_decisions) / (now - last):.1f} '
+                f'decisions/s, RSS {memory / 2**20:.1f} MiB '
+                f'({(memory - baseline) / 2**20:+.1f})'
+            )
+            assert max_growth is None or memory - baseline <= max_growth, (
+                f'memory grew by {(memory - baseline) / 2**20:.2f} MiB'
+            )
+
+            last = now
+            reported_blocks = blocks
+            reported_decisions = player.decisions
+            if done:
+                break
+    except BlockLimitException:
+        pass
+
+    return blocks
+
+
+parser = argparse.ArgumentParser(description='Play Tetris without a display')
+parser.add_argument('--games', default=1, type=int)
+parser.add_argument('--seed', default=DEFAULT_SEED, type=int)
+parser.add_argument('--blocks', default=BLOCK_LIMIT, type=int)
+parser.add_argument('--width', default=BOARD_WIDTH, type=int)
+parser.add_argument('--height', default=BOARD_HEIGHT, type=int)
+parser.add_argument(
+    '--adversary',
+    default='random',
+    choices=sorted(adversaries)
+)
+parser.add_argument(
+    '--deadline',
+    default=None,
+    type=milliseconds,
+    help='Milliseconds the player may take per decision'
+)
+parser.add_argument(
+    '--workers',
+    default=None,
+    type=int,
+    help='Processes the player may spread its search over'
+)
+parser.add_argument(
+    '--tucks',
+    default=False,
+    action='store_true',
+    help='Let the player slide blocks underneath overhangs'
+)
+parser.add_argument(
+    '--beam',
+    default=None,
+    type=int,
+    help='Let the player reconsider its planned second placement among '
+         'this many'
+)
+parser.add_argument(
+    '--endless',
+    default=False,
+    action='store_true',
+    help='Play one game without a block limit, until the player dies or '
+         '--duration runs out, reporting throughput and memory'
+)
+parser.add_argument(
+    '--duration',
+    default=None,
+    type=float,
+    help='Seconds after which an endless game stops'
+)
+parser.add_argument(
+    '--interval',
+    default=10,
+    type=float,
+    help='Seconds between reports of an endless game'
+)
+parser.add_argument(
+    '--max-growth',
+    default=None,
+    type=float,
+    help='Megabytes the memory of an endless game may grow by after its '
+         'first report'
+)
+parser.add_argument(
+    '--record',
+    metavar='DIRECTORY',
+    help='Log every decision of the player as training data'
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    recorder = None
+    if args.record:
+        # Only needed (and only requires NumPy) when recording.
+        from dataset import ShardWriter
+        recorder = ShardWriter(args.record, args.width, args.height)
+
+    try:
+        if args.endless:
+            board = Board(args.width, args.height)
+            player = SelectedPlayer(
+                recorder=recorder,
+                deadline=args.deadline,
+                workers=args.workers,
+                tucks=args.tucks,
+                beam=args.beam
+            )
+            adversary = adversaries[args.adversary](args.seed, None)
+            max_growth = None
+            if args.max_growth is not None:
+                max_growth = args.max_growth * 2**20
+
+            blocks = soak(
+                board,
+                player,
+                adversary,
+                args.duration,
+                args.interval,
+                max_growth
+            )
+            result = 'STOPPED' if board.alive else 'LOST'
+            print(
+                f'seed {args.seed}: {board.score} {result} after {blocks} '
+                f'blocks'
+            )
+        else:
+            for seed in range(args.seed, args.seed + args.games):
+                board = Board(args.width, args.height)
+                player = SelectedPlayer(
+                    recorder=recorder,
+                    deadline=args.deadline,
+                    workers=args.workers,
+                    tucks=args.tucks,
+                    beam=args.beam
+                )
+                adversary = adversaries[args.adversary](seed, args.blocks)
+
+                start = time.monotonic()
+                won = play(board, player, adversary)
+                elapsed = time.monotonic() - start
+
+                result = 'WON' if won else 'LOST'
+                print(f'seed {seed}: {board.score} {result} in {elapsed:.1f}s')
+    finally:
+        if recorder is not None:
+            recorder.close()
@@ -0,0 +1,337 @@
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from time import monotonic, sleep
+
+import json
+
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5
+)
+SCORE_BUCKETS = (1000, 2500, 5000, 10000, 20000, 40000, 80000)
+
+# Blocks per second are measured over this many seconds.
+RATE_WINDOW = 10
+
+
+class Histogram:
+    """
+    Counts observations into cumulative buckets, Prometheus style.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in.
+        """
+
+        if not self.count:
+            return 0
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= q * self.count:
+                return bound
+        return float('inf')
+
+    def render(self, name):
+        lines = [f'# TYPE {name} histogram']
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum {self.sum}')
+        lines.append(f'{name}_count {self.count}')
+        return lines
+
+    def state(self):
+        return {
+            'counts': list(self.counts),
+            'count': self.count,
+            'sum': self.sum,
+        }
+
+    def merge(self, state):
+        """
+        Adds the observations of a histogram with the same buckets.
+        """
+
+        for i, count in enumerate(state['counts']):
+            self.counts[i] += count
+        self.count += state['count']
+        self.sum += state['sum']
+
+
+class Metrics:
+    """
+    Statistics about the games played by this process, or merged from the
+    processes that played them (see state and merge). All methods may be
+    called from any thread.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.started = monotonic()
+
+        self.games_in_progress = 0
+        self.games_completed = {'won': 0, 'lost': 0}
+        self.blocks = 0
+        self.lines = {1: 0, 2: 0, 3: 0, 4: 0}
+        self.messages = {'sent': 0, 'received': 0}
+        self.scores = Histogram(SCORE_BUCKETS)
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.recent_blocks = deque()
+
+        # The state as of the last changes, for working out the next ones.
+        self.reported = None
+        self.reporting = Lock()
+
+    def game_started(self):
+        with self.lock:
+            self.games_in_progress += 1
+
+    def game_stopped(self):
+        """
+        Counts a game that was started here as no longer in progress, when
+        it was finished elsewhere (and merged) or abandoned.
+        """
+
+        with self.lock:
+            self.games_in_progress -= 1
+
+    def game_finished(self, won, score):
+        with self.lock:
+            self.games_in_progress -= 1
+            self.games_completed['won' if won else 'lost'] += 1
+            self.scores.observe(score)
+
+    def block_placed(self, lines):
+        with self.lock:
+            self.blocks += 1
+            self.recent_blocks.append(monotonic())
+            self.block_rate()
+            if lines:
+                self.lines[lines] = self.lines.get(lines, 0) + 1
+
+    def message(self, direction):
+        with self.lock:
+            self.messages[direction] += 1
+
+    def decision(self, seconds):
+        with self.lock:
+            self.latency.observe(seconds)
+
+    def state(self):
+        """
+        Returns the counters and histograms as plain (JSON serializable)
+        data, to be merged into the metrics of another process.
+        """
+
+        with self.lock:
+            return {
+                'games_completed': dict(self.games_completed),
+                'blocks': self.blocks,
+                'lines': {
+                    str(count): times for count, times in self.lines.items()
+                },
+                'messages': dict(self.messages),
+                'scores': self.scores.state(),
+                'latency': self.latency.state(),
+            }
+
+    def changes(self):
+        """
+        Returns the state as state does, but less what was returned the last
+        time, so that another process can merge the changes as they come.
+        """
+
+        with self.reporting:
+            state = self.state()
+            changes = difference(state, self.reported)
+            self.reported = state
+        return changes
+
+    def merge(self, state):
+        """
+        Adds the counters and histograms of another process, as returned by
+        its state or changes. Its blocks count towards the block rate as of
+        now, so a process sending its changes every second or so keeps the
+        rate live.
+        """
+
+        now = monotonic()
+        with self.lock:
+            for result, count in state['games_completed'].items():
+                self.games_completed[result] += count
+            self.blocks += state['blocks']
+            self.recent_blocks.extend([now] * state['blocks'])
+            for count, times in state['lines'].items():
+                count = int(count)
+                self.lines[count] = self.lines.get(count, 0) + times
+            for direction, count in state['messages'].items():
+                self.messages[direction] += count
+            self.scores.merge(state['scores'])
+            self.latency.merge(state['latency'])
+
+    def block_rate(self):
+        """
+        Blocks per second over the last few seconds.
+        """
+
+        now = monotonic()
+        while self.recent_blocks and self.recent_blocks[0] < now - RATE_WINDOW:
+            self.recent_blocks.popleft()
+        window = min(RATE_WINDOW, now - self.started)
+        return len(self.recent_blocks) / window if window else 0
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text format.
+        """
+
+        with self.lock:
+            lines = [
+                '# TYPE tetris_games_in_progress gauge',
+                f'tetris_games_in_progress {self.games_in_progress}',
+                '# TYPE tetris_games_completed_total counter',
+            ]
+            for result, count in self.games_completed.items():
+                lines.append(
+                    f'tetris_games_completed_total{{result="{result}"}} '
+                    f'{count}'
+                )
+
+            lines += [
+                '# TYPE tetris_blocks_total counter',
+                f'tetris_blocks_total {self.blocks}',
+                '# TYPE tetris_blocks_per_second gauge',
+                f'tetris_blocks_per_second {self.block_rate():.2f}',
+                '# TYPE tetris_lines_cleared_total counter',
+            ]
+            for count, times in sorted(self.lines.items()):
+                lines.append(
+                    f'tetris_lines_cleared_total{{lines="{count}"}} {times}'
+                )
+
+            lines.append('# TYPE tetris_protocol_messages_total counter')
+            for direction, count in self.messages.items():
+                lines.append(
+                    f'tetris_protocol_messages_total'
+                    f'{{direction="{direction}"}} {count}'
+                )
+
+            lines += self.scores.render('tetris_score')
+            lines += self.latency.render('tetris_decision_latency_seconds')
+
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """
+        Returns a one-line summary, for writing to logs.
+        """
+
+        with self.lock:
+            uptime = monotonic() - self.started
+            return (
+                f'STATS uptime={uptime:.1f}s '
+                f'games={self.games_in_progress}/'
+                f'{sum(self.games_completed.values())} '
+                f'blocks={self.blocks} '
+                f'blocks/s={self.block_rate():.1f} '
+                f'messages={sum(self.messages.values())} '
+                f'lines={",".join(str(n) for n in self.lines.values())} '
+                f'latency_p50={self.latency.quantile(0.5)}s '
+                f'latency_p99={self.latency.quantile(0.99)}s'
+            )
+
+
+def difference(state, previous):
+    """
+    Subtracts an earlier state of the same metrics from a state, field by
+    field. Without an earlier state, the state is returned as it is.
+    """
+
+    if previous is None:
+        return state
+    if isinstance(state, dict):
+        return {
+            key: difference(value, previous.get(key))
+            for key, value in state.items()
+        }
+    if isinstance(state, list):
+        return [difference(*values) for values in zip(state, previous)]
+    return state - previous
+
+
+def serve(metrics, port, host='127.0.0.1'):
+    """
+    Serves the metrics over HTTP on a background thread. Raises OSError if
+    the port is taken; every process needs a port of its own, so a fleet of
+    referees should rather be served by one process merging their metrics
+    (as tournament.py --metrics-port does).
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep request logs off stderr, which carries the game results.
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    thread = Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def dump_periodically(metrics, interval, stream):
+    """
+    Writes a summary line to the given stream every interval seconds, on a
+    background thread.
+    """
+
+    def dump():
+        while True:
+            sleep(interval)
+            stream.write(metrics.summary() + '\n')
+            stream.flush()
+
+    thread = Thread(target=dump)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def send_periodically(metrics, interval, stream):
+    """
+    Writes the changes to the metrics (see Metrics.changes) as a METRICS
+    line to the given stream every interval seconds, on a background thread.
+    """
+
+    def send():
+        while True:
+            sleep(interval)
+            stream.write(f'METRICS {json.dumps(metrics.changes())}\n')
+            stream.flush()
+
+    thread = Thread(target=send)
+    thread.daemon = True
+    thread.start()
+    return thread
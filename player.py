@@ -1,13 +1,32 @@
-from board import Direction, Rotation
+from board import Block, Direction, Rotation, Shape
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from random import Random
-from time import sleep
+from threading import Event, Thread
+from time import monotonic, sleep
 from exceptions import NoBlockException
+from features import column_heights, extract_features, row_masks
+from reachability import ReachabilitySearch, perform
+from ringlog import log
+from snapshot import decode, encode
+
+import multiprocessing
 
 # references
 # https://codemyroad.wordpress.com/2013/04/14/tetris-ai-the-near-perfect-player/
 class Player:
     def choose_action(self, board):
         raise NotImplementedError
+
+    def ponder(self, board):
+        """
+        Called while waiting for the adversary to pick the next shape. Players
+        may use the time to think ahead.
+        """
+
+    def stop_pondering(self):
+        """
+        Called once the next shape is known.
+        """
 class MyPlayer(Player):
     # heuristic constants
     heightConstant = -0.410066
@@ -15,6 +34,15 @@ class MyPlayer(Player):
     holesConstant = -0.95663
     bumpinessConstant = -0.284483
 
+    # The constants search_window switches to when the board is in danger or
+    # not. Lines keep linesConstant until the board is first in danger, and
+    # their danger weight from then on.
+    dangerHeightConstant = -0.8
+    dangerLinesConstant = 1.46
+    dangerHolesConstant = -1.2
+    safeHeightConstant = -0.510066
+    safeHolesConstant = -1.5663
+
     moves = 0
 
     best_horizontal_position = None
@@ -23,30 +51,60 @@ class MyPlayer(Player):
     second_move = None
     second_rotation = None
 
-    def __init__(self, seed=None):
+    # Actions leading to the best first placement, if it is one that can only
+    # be reached by moving the block under an overhang.
+    best_actions = None
+
+    # Every placement of the next block after the best first placement, as
+    # scored by the search, for expand to keep the best of.
+    best_children = None
+
+    # How many of the first placements the last search covered.
+    coverage = None
+
+    # The placements of the next block after the last decision that are
+    # worth looking further into, best first, as (score, rotation,
+    # horizontal moves), with the position they apply to.
+    subtree = None
+    subtree_position = None
+
+    # Decisions worked out while waiting for the next shape, by shape.
+    pondered = None
+    pondered_position = None
+    pondering = None
+
+    def __init__(self, seed=None, cache=None, recorder=None, deadline=None,
+                 workers=None, tucks=False, beam=None):
         self.random = Random(seed)
+        # If given, the planned second placement is not replayed blindly but
+        # weighed against this many other placements of the same block,
+        # looking one block further ahead now that it is known.
+        self.beam = beam
+        # Whether to also search placements underneath overhangs.
+        self.tucks = tucks
+        # Seconds a decision may take; the search returns the best plan it
+        # found so far once they run out.
+        self.deadline = deadline
+        # Number of processes to spread first placements over, if any.
+        self.workers = workers
+        if workers:
+            # Fork them now, from the main thread, rather than from whichever
+            # thread (possibly the pondering one) searches first.
+            process_pool(workers)
+        # Optional decision_cache.DecisionCache consulted before searching.
+        self.cache = cache
+        # Optional dataset.ShardWriter that every decision is logged to.
+        self.recorder = recorder
 
     def generate_column_height(self, board):
-        columns = [0] * board.width
-        # take only the highest value of y into consideration
-        # start from bottom of y
-        for y in reversed(range(board.height)):
-            for x in range(board.width):
-                if (x,y) in board.cells:
-                    height = abs(board.height - y)
-                    columns[x] = height
-        return columns
-
-    def check_height(self,board):
-        columns = self.generate_column_height(board)
+        return column_heights(row_masks(board), board.height, board.width)
+
+    def check_height(self, features):
+        columns = features.heights
         return (sum(columns)  / len(columns)) * self.heightConstant
     
-    def check_bumpiness(self, board):
-        total = 0
-        columns = self.generate_column_height(board)
-        for i in range(9):
-            total += abs(columns[i] - columns[i+1])
-        return total * self.bumpinessConstant
+    def check_bumpiness(self, features):
+        return features.bumpiness * self.bumpinessConstant
 
     def check_lines(self, originalBoard, board):
         score = board.score - originalBoard.score
@@ -62,32 +120,21 @@ class MyPlayer(Player):
         #     complete_line += 1
         return complete_line * self.linesConstant
     
-    def check_min_max_difference(self, board):
-        columns = self.generate_column_height(board)
+    def check_min_max_difference(self, features):
+        columns = features.heights
 
         return max(columns) - min(columns) * -0.2466
 
     
-    def check_holes(self, board):
-        columns = self.generate_column_height(board)
-        tally = [0] * 10 
-        for x in range(board.width):
-            for y in range(board.height - columns[x], board.height):
-                if (x, y) not in board.cells:
-                        tally[x] += 1
-        return self.holesConstant * sum(tally)
-
-    def check_wells(self, board):
-        columns = self.generate_column_height(board)
-        tally = [0] * 10 
-        for x in range(board.width):
-            for y in range(board.height - columns[x], board.height):
-                if(x,y) not in board.cells:
-                    tally[x] += 1
-        return max(tally) * self.holesConstant * 1.2
+    def check_holes(self, features):
+        return self.holesConstant * features.holes
+
+    def check_wells(self, features):
+        return max(features.column_holes) * self.holesConstant * 1.2
 
     def calc_score(self, originalBoard, board):
-        total = self.check_height(board) + self.check_holes(board) + self.check_lines(originalBoard, board) + self.check_bumpiness(board) + self.check_wells(board)
+        features = extract_features(board)
+        total = self.check_height(features) + self.check_holes(features) + self.check_lines(originalBoard, board) + self.check_bumpiness(features) + self.check_wells(features)
         #  + self.check_mean_height(board)
         return total
 
@@ -97,9 +144,16 @@ class MyPlayer(Player):
                         board.rotate(Rotation.Anticlockwise)
                     except NoBlockException:
                         pass
+    def spawn_offset(self, board):
+        """
+        The horizontal placement that leaves a block in the column it spawns
+        in. Placements are numbered from there, counting to the left.
+        """
+
+        return board.width // 2 - 1
+
     def try_moves(self, moves, board):
-    # 4 here since the board spawns the shape at 6 and not in center ***
-            move = 4 - moves
+            move = self.spawn_offset(board) - moves
             if (move >= 0):
                 for _ in range(move):
                     try:
@@ -117,57 +171,268 @@ class MyPlayer(Player):
             except NoBlockException:
                 pass
 
-    def simulate_best_position(self, board):
-        score = None
+    def in_danger(self, columns, height):
+        # Thresholds are a quarter, a third and a sixth of the height (6, 8
+        # and 4 on the standard board). The average is taken over the left
+        # seven tenths of the columns but divided by eight tenths of them (7
+        # and 8 on the standard board).
+        width = len(columns)
+        columns_more_than_six = [column for column in columns if column > height // 4]
+        columns_more_than_eight = [column for column in columns if column > height // 3]
+        avg = sum(columns[:width * 7 // 10]) / max(width * 8 // 10, 1)
+        return avg >= height / 6 or len(columns_more_than_six) > 3 or len(columns_more_than_eight) > 2
+
+    def candidates(self, board, lower, upper):
+        """
+        Lists the first-ply placements to search, as (rotation, horizontal
+        moves). When searching against a deadline, placements close to the
+        previous best one come first, as they are the most likely to be good;
+        simulate_best_position still breaks ties in the unsorted order, so a
+        search covering every placement decides as if it were not sorted.
+        """
+
+        candidates = [
+            (rotation, horizontal_moves)
+            for rotation in range(4)
+            for horizontal_moves in range(lower, upper)
+        ]
+
+        if self.deadline is not None and self.best_horizontal_position is not None:
+            previous = self.spawn_offset(board) - self.best_horizontal_position
+            candidates.sort(key=lambda candidate: (
+                abs(candidate[1] - previous),
+                candidate[0] != self.best_rotation_position,
+            ))
+
+        return candidates
+
+    def search_first_ply(self, board, rotation, horizontal_moves, lower, upper):
+        """
+        Makes the given first placement and finds the best second placement
+        after it. Returns what search_second_ply does.
+        """
+
+        cloned_board = board.clone()
+        self.try_rotation(rotation, cloned_board)
+        self.try_moves(horizontal_moves, cloned_board)
+        return self.search_second_ply(board, cloned_board, lower, upper)
+
+    def search_second_ply(self, board, cloned_board, lower, upper):
+        """
+        Finds the best second placement on the board left by a first one.
+        Returns the combined score with the second placement, its rotation
+        and horizontal moves, and every second placement searched as (score,
+        rotation, horizontal moves), scored on its own.
+        """
+
+        best = None
+        children = []
+        calculated_score = self.calc_score(board,cloned_board)
+
+        for second_rotation in range(4):
+            for second_horizontal_moves in range(lower, upper):
+                second_board = cloned_board.clone()
+                self.try_rotation(second_rotation, second_board)
+                self.try_moves(second_horizontal_moves, second_board)
+
+                calc_second_score = self.calc_score(cloned_board, second_board)
+                children.append((calc_second_score, second_rotation, second_horizontal_moves))
+                if best is None or calc_second_score + calculated_score > best[0]:
+                    best = (calc_second_score + calculated_score, second_rotation, second_horizontal_moves)
+
+        return best, children
+
+    def search_serial(self, board, candidates, lower, upper, stop):
+        """
+        Yields the candidates with the result of searching them, in order,
+        until stop returns True.
+        """
+
+        for searched, (rotation, horizontal_moves) in enumerate(candidates):
+            # Always search at least one placement so there is a plan.
+            if searched and stop is not None and stop():
+                return
+
+            yield (rotation, horizontal_moves), self.search_first_ply(board, rotation, horizontal_moves, lower, upper)
+
+    def search_parallel(self, board, candidates, lower, upper, stop):
+        """
+        Like search_serial, but searches all candidates at once on a pool of
+        processes that is kept around between decisions. Candidates that were
+        not searched by the time stop returns True are dropped.
+        """
+
+        pool, decision = process_pool(self.workers)
+        decision.value += 1
+        number = decision.value
+        state = encode(board)
+        constants = (
+            self.heightConstant,
+            self.linesConstant,
+            self.holesConstant,
+            self.bumpinessConstant,
+        )
+        futures = [
+            pool.submit(search_candidate, number, state, constants, rotation, horizontal_moves, lower, upper)
+            for rotation, horizontal_moves in candidates
+        ]
+
+        if stop is not None:
+            pending = set(futures)
+            while pending and not (len(pending) < len(futures) and stop()):
+                done, pending = wait(pending, timeout=0.001, return_when=FIRST_COMPLETED)
+            for future in pending:
+                future.cancel()
+            # Tasks already handed to a process cannot be cancelled; tell
+            # them to return straight away instead of holding up the next
+            # decision.
+            decision.value += 1
+
+        for candidate, future in zip(candidates, futures):
+            if future.done() and not future.cancelled():
+                if future.result() is not None:
+                    yield candidate, future.result()
+            elif stop is None:
+                yield candidate, future.result()
+
+    def search_window(self, board):
+        """
+        Sets the heuristic constants for how much danger the board is in, and
+        returns the range of horizontal moves to search.
+        """
+
         columns = self.generate_column_height(board)
-        columns_more_than_six = [column for column in columns if column > 6]
-        columns_more_than_eight = [column for column in columns if column > 8]
-        upper = 10
+        upper = board.width
         lower = 2
-        avg = sum(columns[0:7]) / 8
-        all_avg = sum(columns) / len(columns)
-        if (avg >= 4 or len(columns_more_than_six) > 3 or len(columns_more_than_eight) > 2):
-            self.linesConstant = 1.46
-            self.heightConstant = -0.8
-            self.holesConstant = -1.2
-            upper = 10
+        if self.in_danger(columns, board.height):
+            self.linesConstant = self.dangerLinesConstant
+            self.heightConstant = self.dangerHeightConstant
+            self.holesConstant = self.dangerHolesConstant
+            upper = board.width
             lower = 0
         else:
             # self.linesConstant = -0.962
-            self.heightConstant = -0.510066
-            self.holesConstant = -1.5663
+            self.heightConstant = self.safeHeightConstant
+            self.holesConstant = self.safeHolesConstant
             lower = 2
 
+        return lower, upper
 
+    def simulate_best_position(self, board, stop=None):
+        """
+        Searches two placements deep for the best first placement. If given,
+        stop is called between first placements, and the search returns what
+        it found so far once it returns True. The number of first placements
+        searched and available is left in coverage.
+        """
+
+        score = None
+        offset = self.spawn_offset(board)
+        lower, upper = self.search_window(board)
+
+        candidates = self.candidates(board, lower, upper)
+        if self.workers:
+            results = self.search_parallel(board, candidates, lower, upper, stop)
+        else:
+            results = self.search_serial(board, candidates, lower, upper, stop)
+
+        searched = 0
+        first = None
+        for (rotation, horizontal_moves), (best, children) in results:
+            searched += 1
+
+            # Where the placement comes in the unsorted candidates, which
+            # decides between equal scores.
+            order = rotation * (upper - lower) + horizontal_moves - lower
+            if score is None or best[0] > score or (best[0] == score and order < first):
+                first = order
+                score, second_rotation, second_horizontal_moves = best
+                self.second_rotation = second_rotation
+                self.second_move = offset - second_horizontal_moves
+                self.best_horizontal_position = offset - horizontal_moves
+                self.best_rotation_position = rotation
+                self.best_children = children
+
+        self.coverage = (searched, len(candidates))
+
+        self.best_actions = None
+        if self.tucks and not (stop is not None and stop()):
+            self.search_tucks(board, score, lower, upper)
+
+    def search_tucks(self, board, score, lower, upper):
+        """
+        Searches the first placements underneath an overhang, which the
+        rotate, shift and drop candidates can never reach, and keeps the best
+        of them if it beats the given score.
+        """
+
+        search = ReachabilitySearch(board.width, board.height)
+        for cells, actions in search.tucks(board):
+            cloned_board = board.clone()
+            perform(cloned_board, actions)
+            best, children = self.search_second_ply(board, cloned_board, lower, upper)
+
+            if best[0] > score:
+                score, second_rotation, second_horizontal_moves = best
+                self.second_rotation = second_rotation
+                self.second_move = self.spawn_offset(board) - second_horizontal_moves
+                self.best_actions = actions
+                self.best_children = children
+
+    def expand(self, board, rotation, move, actions=None, children=None):
+        """
+        Makes the decided first placement and keeps the best placements of
+        the next block after it for the next decision to look one block
+        further into. The placements are taken from children, as scored by
+        the search that made the decision, or scored here if it has none
+        (such as a decision taken from the cache).
+        """
+
+        cloned_board = board.clone()
+        if actions is not None:
+            perform(cloned_board, actions)
+        else:
+            self.try_rotation(rotation, cloned_board)
+            self.try_moves(self.spawn_offset(board) - move, cloned_board)
+
+        if children is None:
+            lower, upper = self.search_window(board)
+            _, children = self.search_second_ply(board, cloned_board, lower, upper)
+
+        # Stable, so ties keep the order the full search prefers.
+        children = sorted(children, key=lambda child: -child[0])
+        self.subtree = children[:self.beam]
+        self.subtree_position = position(cloned_board)
+
+    def revise(self, board):
+        """
+        Searches one block deeper below the placements kept by expand, now
+        that the next block is known, and plans the best of them with the
+        best placement of the next block after it. Returns the rotation and
+        move of the placement to make now.
+        """
+
+        offset = self.spawn_offset(board)
+        lower, upper = self.search_window(board)
+
+        best = None
+        for _, rotation, horizontal_moves in self.subtree:
+            cloned_board = board.clone()
+            self.try_rotation(rotation, cloned_board)
+            self.try_moves(horizontal_moves, cloned_board)
+            result, children = self.search_second_ply(board, cloned_board, lower, upper)
+
+            if best is None or result[0] > best[0][0]:
+                best = result, rotation, horizontal_moves
+                self.best_children = children
+
+        (_, second_rotation, second_horizontal_moves), rotation, horizontal_moves = best
+        self.second_rotation = second_rotation
+        self.second_move = offset - second_horizontal_moves
+        self.best_rotation_position = rotation
+        self.best_horizontal_position = offset - horizontal_moves
+        return rotation, offset - horizontal_moves
 
-        for rotation in range(4):
-            for horizontal_moves in range(lower, upper):
-                cloned_board = board.clone()
-                self.try_rotation(rotation, cloned_board)
-                self.try_moves(horizontal_moves, cloned_board)
-                calculated_score = self.calc_score(board,cloned_board)
-
-                for second_rotation in range(4):
-                    for second_horizontal_moves in range(lower, upper):
-                        second_board = cloned_board.clone()
-                        self.try_rotation(second_rotation, second_board)
-                        self.try_moves(second_horizontal_moves, second_board)
-
-                        calc_second_score = self.calc_score(cloned_board, second_board)
-                        if score is None:
-                            score = calc_second_score + calculated_score
-                            self.second_rotation = second_rotation
-                            self.second_move = 4 - second_horizontal_moves
-                            self.best_horizontal_position = 4 - horizontal_moves
-                            self.best_rotation_position = rotation
-
-                        if calc_second_score + calculated_score > score:
-                            score = calc_second_score + calculated_score
-                            self.second_rotation = second_rotation
-                            self.second_move = 4 - second_horizontal_moves
-                            self.best_horizontal_position = 4 - horizontal_moves
-                            self.best_rotation_position = rotation
-    
     def generate_moves(self, rotation, move):
         generated_moves = []
         for _ in range(rotation):
@@ -183,21 +448,253 @@ class MyPlayer(Player):
         return generated_moves
     
 
+    def record(self, board, rotation, move, actions=None):
+        """
+        Logs a decision together with the row the block lands in and the
+        score and lines it results in. A decision made as a list of actions,
+        such as a tuck, is logged as the rotation and move that bring the
+        block above the column it lands in.
+        """
+
+        result = board.clone()
+        block = result.falling
+        if actions is None:
+            self.try_rotation(rotation, result)
+            self.try_moves(self.spawn_offset(board) - move, result)
+        else:
+            perform(result, actions)
+
+            rotation = (block.rotation - board.falling.rotation) % 4
+            probe = board.clone()
+            spawned = probe.falling
+            self.try_rotation(rotation, probe)
+            move = block.x - spawned.x
+
+        lines = len(result.cleared or ())
+        self.recorder.record(
+            board,
+            rotation,
+            move,
+            block.y,
+            result.score - board.score,
+            lines
+        )
+
+    def ponder(self, board):
+        """
+        Starts working out, on a background thread, the decision for every
+        shape that may come next. Nothing to do if the next decision will
+        just play the second move of the current plan.
+        """
+
+        self.stop_pondering()
+        self.pondered = {}
+
+        if board.falling is None:
+            return
+        if self.second_move is not None and self.second_rotation is not None:
+            return
+
+        self.pondered_position = position(board)
+        stop = Event()
+        self.pondering = (stop, Thread(
+            target=self.ponder_shapes,
+            args=(board.clone(), stop)
+        ))
+        self.pondering[1].daemon = True
+        self.pondering[1].start()
+
+    def ponder_shapes(self, board, stop):
+        for shape in Shape:
+            if stop.is_set():
+                return
+
+            board.next = Block(shape)
+            self.simulate_best_position(board, stop.is_set)
+
+            # Only keep complete searches; they decide like a normal one.
+            searched, total = self.coverage
+            if searched == total and not stop.is_set():
+                self.pondered[shape] = (
+                    self.best_rotation_position,
+                    self.best_horizontal_position,
+                    self.second_rotation,
+                    self.second_move,
+                    self.best_actions,
+                    self.best_children,
+                )
+
+    def stop_pondering(self):
+        """
+        Cancels the search for the shapes that did not come.
+        """
+
+        if self.pondering is None:
+            return
+
+        stop, thread = self.pondering
+        stop.set()
+        thread.join()
+        self.pondering = None
+
+        # The searches left their last plan behind; it is not ours.
+        self.second_move = None
+        self.second_rotation = None
+
     def choose_action(self, board):
         self.moves += 1
-        print("moves", self.moves)
-        if (self.second_move is not None and self.second_rotation is not None):
-            print(self.second_move)
+        log.debug('decision %d', self.moves)
+
+        pondered = None
+        actions = None
+        children = None
+        if self.pondered and board.next is not None:
+            if position(board) == self.pondered_position:
+                pondered = self.pondered.get(board.next.shape)
+            self.pondered = None
+
+        subtree = self.subtree
+        self.subtree = None
+
+        if (
+            self.beam and subtree and board.next is not None and
+            self.second_move is not None and self.second_rotation is not None and
+            position(board) == self.subtree_position
+        ):
+            planned = self.second_rotation, self.second_move
+            self.subtree = subtree
+            rotation, move = self.revise(board)
+            children = self.best_children
+            log.debug(
+                'revised planned rotation %d, move %d to rotation %d, move %d',
+                *planned,
+                rotation,
+                move
+            )
+        elif (self.second_move is not None and self.second_rotation is not None):
+            log.debug(
+                'replaying planned rotation %d, move %d',
+                self.second_rotation,
+                self.second_move
+            )
 
             rotation = self.second_rotation
             move = self.second_move
             self.second_move = None
             self.second_rotation = None
-            return self.generate_moves(rotation, move)
+        elif pondered is not None:
+            (
+                rotation,
+                move,
+                self.second_rotation,
+                self.second_move,
+                actions,
+                children,
+            ) = pondered
+            self.best_rotation_position = rotation
+            self.best_horizontal_position = move
         else:
-            self.simulate_best_position(board)
-            return self.generate_moves(self.best_rotation_position, self.best_horizontal_position)
+            cached = None
+            if self.cache is not None:
+                columns = self.generate_column_height(board)
+                danger = self.in_danger(columns, board.height)
+                cached = self.cache.lookup(board, danger)
+
+            if cached is not None:
+                rotation, move = cached
+            else:
+                stop = None
+                if self.deadline is not None:
+                    end = monotonic() + self.deadline
+                    stop = lambda: monotonic() >= end
+
+                self.simulate_best_position(board, stop)
+                log.info('searched %d of %d placements', *self.coverage)
+                rotation = self.best_rotation_position
+                move = self.best_horizontal_position
+                actions = self.best_actions
+                children = self.best_children
+
+        if self.beam and self.second_move is not None:
+            self.expand(board, rotation, move, actions, children)
+
+        if self.recorder is not None:
+            self.record(board, rotation, move, actions)
+
+        if actions is not None:
+            return actions
+        return self.generate_moves(rotation, move)
+
+
+
+def position(board):
+    """
+    Identifies the stack and falling block of a board, to tell whether a
+    decision worked out in advance still applies.
+    """
+
+    falling = None
+    if board.falling is not None:
+        falling = frozenset(board.falling.cells)
+    return board.cells, falling
+
+
+pools = {}
+
+# In a worker process, the number of the decision that is being searched,
+# shared with the process submitting the searches.
+current_decision = None
+
+
+def start_worker(decision):
+    global current_decision
+    current_decision = decision
+
+
+def process_pool(workers):
+    """
+    Returns a pool of the given number of processes, created once and then
+    reused for every decision, with the shared number of the decision it is
+    searching for.
+
+    The processes are forked as the pool is created, all at once. They are
+    forked rather than spawned as the scripts using MyPlayer (server.py
+    among them) play at import time, which spawned processes would repeat.
+    """
+
+    if workers not in pools:
+        context = multiprocessing.get_context('fork')
+        decision = context.Value('i', 0, lock=False)
+        pool = ProcessPoolExecutor(
+            workers,
+            mp_context=context,
+            initializer=start_worker,
+            initargs=(decision,)
+        )
+        # Forking pools start every process on the first submission.
+        pool.submit(int).result()
+        pools[workers] = pool, decision
+    return pools[workers]
+
+
+def search_candidate(decision, state, constants, rotation, horizontal_moves, lower, upper):
+    """
+    Searches one first placement of the given decision in a worker process.
+    Returns None without searching if the decision was given up on.
+    """
+
+    if current_decision.value != decision:
+        return None
 
+    player = MyPlayer()
+    (
+        player.heightConstant,
+        player.linesConstant,
+        player.holesConstant,
+        player.bumpinessConstant,
+    ) = constants
+    board = decode(state)
+    return player.search_first_ply(board, rotation, horizontal_moves, lower, upper)
 
 
 class RandomPlayer(Player):
@@ -0,0 +1,282 @@
+from board import Direction, Rotation, shape_rotations
+from collections import deque
+from features import row_masks
+from functools import lru_cache
+
+
+class Orientation:
+    """
+    An orientation of a shape as given by board.shape_rotations, with its
+    row bitmasks shifted to every column the shape fits in.
+    """
+
+    masks = None
+    width = None
+    height = None
+    cells = None
+    corner = None
+    shifted = None
+
+    def __init__(self, orientation, board_width):
+        self.masks = orientation.masks
+        self.width = orientation.width
+        self.height = orientation.height
+        self.cells = orientation.cells
+        self.corner = orientation.corner
+
+        # The collision masks of the shape at every column it fits in.
+        self.shifted = [
+            [mask << x for mask in self.masks]
+            for x in range(board_width - self.width + 1)
+        ]
+
+
+@lru_cache(maxsize=None)
+def rotations(shape, board_width):
+    """
+    Returns the four orientations of a shape, indexed by the number of times
+    it was rotated anticlockwise, together with how far the top left corner
+    moves when rotating from one orientation to another.
+    """
+
+    orientations, shifts = shape_rotations(shape)
+    return [
+        Orientation(orientation, board_width) for orientation in orientations
+    ], shifts
+
+
+def locate(block):
+    """
+    Returns the orientation of a block, as its index in rotations, and the
+    position of its top left corner.
+    """
+
+    return block.rotation, block.x, block.y
+
+
+class ReachabilitySearch:
+    """
+    Finds every position a falling block can land in, including those that
+    are only reached by sliding it under an overhang or rotating it into
+    place, with the shortest list of actions that gets it there.
+
+    The search is breadth first over (orientation, x, y) states and follows
+    the rules of Board: every action is followed by the implicit move down,
+    and rotations use the wall and top corrections of Block.rotate. Before
+    searching, the board is turned into one bitmask per orientation and
+    column with bit y set when the block does not fit at that height, so
+    that moving and landing the block are single bit tests.
+    """
+
+    width = None
+    height = None
+
+    # Actions tried from every state; dropping is tried separately.
+    actions = (
+        Direction.Left,
+        Direction.Right,
+        Rotation.Anticlockwise,
+        Rotation.Clockwise,
+        None,
+    )
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def collisions(self, rows, orientation):
+        """
+        Returns a bitmask for every column the orientation fits in, with bit y
+        set if the orientation overlaps a cell or sticks out of the bottom of
+        the board when its top is at row y (up to and including row height,
+        where every orientation sticks out).
+        """
+
+        height = self.height
+        size = orientation.height
+        below = ((1 << (height + 1)) - 1) ^ ((1 << (height - size + 1)) - 1)
+
+        result = []
+        for shifted in orientation.shifted:
+            blocked = below
+            for y in range(height - size + 1):
+                for i, mask in enumerate(shifted):
+                    if rows[y + i] & mask:
+                        blocked |= 1 << y
+                        break
+            result.append(blocked)
+        return result
+
+    def overlaps(self, rows, orientation, x, y):
+        """
+        Checks whether the orientation at the given position overlaps a cell
+        on the board. Rows outside of the board never overlap.
+        """
+
+        height = self.height
+        for i, mask in enumerate(orientation.shifted[x]):
+            if 0 <= y + i < height and rows[y + i] & mask:
+                return True
+        return False
+
+    def rotate(self, rows, orientations, shifts, state, turn):
+        """
+        Returns the state after rotating, or None if the rotation fails and
+        the block stays where it is.
+        """
+
+        rotation, x, y = state
+        new = (rotation + turn) % 4
+        dx, dy = shifts[rotation][new]
+        orientation = orientations[new]
+        x += dx
+        y += dy
+        width = self.width
+
+        # Back off the left and right walls, if nothing is in the way.
+        if x < 0:
+            x = 0
+            if orientation.width > width:
+                return None
+            if self.overlaps(rows, orientation, x, y):
+                return None
+        if x + orientation.width > width:
+            x = width - orientation.width
+            if x < 0 or self.overlaps(rows, orientation, x, y):
+                return None
+
+        # Move down from above the top, unless it would land the block.
+        if y < 0:
+            if (y + orientation.height >= self.height or
+                    self.overlaps(rows, orientation, x, y + 1)):
+                return None
+            y = 0
+
+        if y + orientation.height > self.height:
+            return None
+        if self.overlaps(rows, orientation, x, y):
+            return None
+
+        return new, x, y
+
+    def placements(self, board):
+        """
+        Returns (cells, actions) for every position the falling block can
+        land in, where cells are those the block ends up occupying. Returns
+        an empty list if there is no falling block.
+        """
+
+        block = board.falling
+        if block is None:
+            return []
+
+        width = self.width
+        rows = row_masks(board)
+        orientations, shifts = rotations(block.shape, width)
+        blocked = [self.collisions(rows, o) for o in orientations]
+        sizes = [o.width for o in orientations]
+
+        # One bitset of visited rows per orientation and column.
+        visited = [[0] * width for _ in orientations]
+        start = locate(block)
+        visited[start[0]][start[1]] |= 1 << start[2]
+        parents = {start: None}
+        landed = {}
+        queue = deque([start])
+
+        while queue:
+            state = queue.popleft()
+            rotation, x, y = state
+
+            # Dropping lands the block at the first row it is supported in.
+            # Only worth trying if the block did not just fall into this
+            # row from the state above, which dropped the same way.
+            if y == start[2] or not visited[rotation][x] >> (y - 1) & 1:
+                below = blocked[rotation][x] >> (y + 1)
+                bottom = y + (below & -below).bit_length() - 1
+                landing = rotation, x, bottom
+                if landing not in landed:
+                    landed[landing] = (state, Direction.Drop)
+
+            for action in self.actions:
+                moved = state
+                if action is Direction.Left:
+                    if x > 0 and not blocked[rotation][x - 1] >> y & 1:
+                        moved = rotation, x - 1, y
+                elif action is Direction.Right:
+                    if (x + sizes[rotation] < width and
+                            not blocked[rotation][x + 1] >> y & 1):
+                        moved = rotation, x + 1, y
+                elif action is not None:
+                    turn = 1 if action is Rotation.Anticlockwise else -1
+                    moved = self.rotate(rows, orientations, shifts, state, turn)
+                    if moved is None:
+                        moved = state
+
+                # The implicit move down, which lands a supported block.
+                new, nx, ny = moved
+                if blocked[new][nx] >> (ny + 1) & 1:
+                    if moved not in landed:
+                        landed[moved] = (state, action)
+                elif not visited[new][nx] >> (ny + 1) & 1:
+                    visited[new][nx] |= 1 << (ny + 1)
+                    moved = new, nx, ny + 1
+                    parents[moved] = (state, action)
+                    queue.append(moved)
+
+        # Orientations that look the same land in the same cells; keep the
+        # first way found, which takes the fewest actions.
+        result = {}
+        for (rotation, x, y), (state, action) in landed.items():
+            cells = frozenset(
+                (x + cx, y + cy) for (cx, cy) in orientations[rotation].cells
+            )
+            if cells in result:
+                continue
+
+            actions = [action]
+            while parents[state] is not None:
+                state, action = parents[state]
+                actions.append(action)
+            actions.reverse()
+            result[cells] = actions
+
+        return list(result.items())
+
+    def tucks(self, board):
+        """
+        Like placements, but only those that end up underneath a cell that
+        is already on the board, which dropping a block from above can never
+        reach.
+        """
+
+        rows = row_masks(board)
+        result = []
+        for cells, actions in self.placements(board):
+            above = 0
+            for (x, y) in cells:
+                for row in rows[:y]:
+                    above |= row & (1 << x)
+            if above:
+                result.append((cells, actions))
+        return result
+
+
+def perform(board, actions):
+    """
+    Makes the given actions on a board until the falling block lands, the
+    same way Board.run_player does. Returns True if the block landed.
+    """
+
+    for action in actions:
+        if action is None:
+            landed = board.skip()
+        elif isinstance(action, Direction):
+            landed = board.move(action)
+        else:
+            landed = board.rotate(action)
+
+        if landed:
+            return True
+
+    return False
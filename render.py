@@ -0,0 +1,475 @@
+from adversary import Adversary, adversaries
+from board import (
+    Board,
+    Direction,
+    Rotation,
+    Shape,
+    index_to_shape,
+    shape_to_color,
+    shape_to_index
+)
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from constants import (
+    BOARD_HEIGHT,
+    BOARD_WIDTH,
+    BLOCK_LIMIT,
+    DEFAULT_SEED,
+    PREFIX
+)
+from exceptions import BlockLimitException, UnknownInstructionException
+from player import Player, SelectedPlayer
+
+import argparse
+import os
+import struct
+import time
+import zlib
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# The colors of shape_to_color, as the Tk and pygame displays draw them.
+COLOR_VALUES = {
+    'cyan': (0, 255, 255),
+    'blue': (0, 0, 255),
+    'orange': (255, 165, 0),
+    'yellow': (255, 255, 0),
+    'green': (0, 255, 0),
+    'magenta': (255, 0, 255),
+    'red': (255, 0, 0),
+}
+BACKGROUND = (255, 255, 255)
+SEPARATOR = (0, 0, 0)
+
+# Like the Tk display: the board, with the next block to its right.
+PREVIEW_WIDTH = 6
+CELL_SIZE = 20
+
+
+def chunk(kind, data):
+    """
+    Encodes a PNG chunk.
+    """
+
+    return (
+        struct.pack('>I', len(data)) + kind + data +
+        struct.pack('>I', zlib.crc32(kind + data))
+    )
+
+
+class TranscriptAdversary(Adversary):
+    """
+    Hands out the shapes of a recorded game, in order.
+    """
+
+    def __init__(self, shapes):
+        self.shapes = iter(shapes)
+
+    def choose_block(self, board):
+        shape = next(self.shapes, None)
+        if shape is None:
+            raise BlockLimitException
+        return shape
+
+
+class TranscriptPlayer(Player):
+    """
+    Makes the moves of a recorded game, in order.
+    """
+
+    def __init__(self, moves):
+        self.moves = iter(moves)
+
+    def choose_action(self, board):
+        try:
+            return next(self.moves)
+        except StopIteration:
+            # Like RemotePlayer when the other side goes away.
+            raise UnknownInstructionException
+
+
+def read_transcript(lines):
+    """
+    Reads the shapes and moves of a game from wire protocol messages, as
+    written by client.py and server.py (either or both may be given, in any
+    order; other lines are skipped).
+    """
+
+    shapes = []
+    moves = []
+    for line in lines:
+        line = line.strip()
+        if not line.startswith(PREFIX):
+            continue
+
+        message = line[len(PREFIX)+1:]
+        if message == 'SKIP':
+            moves.append(None)
+            continue
+
+        kinds = ((Shape, shapes), (Direction, moves), (Rotation, moves))
+        for kind, found in kinds:
+            try:
+                found.append(kind(message))
+                break
+            except ValueError:
+                pass
+
+    return shapes, moves
+
+
+def frames(board, player, adversary):
+    """
+    Plays a game, yielding what is on screen after every move: the shape
+    index of every cell, row by row, with the next block shown right of the
+    board.
+    """
+
+    width = board.width
+    height = board.height
+    stride = width + PREVIEW_WIDTH
+
+    def screen():
+        plane = bytearray(stride * height)
+        for y in range(height):
+            plane[y * stride:y * stride + width] = board.colors[
+                y * width:(y + 1) * width
+            ]
+
+        if board.falling is not None:
+            index = shape_to_index[board.falling.shape]
+            for (x, y) in board.falling:
+                if 0 <= y < height:
+                    plane[y * stride + x] = index
+
+        if board.next is not None:
+            index = shape_to_index[board.next.shape]
+            for (x, y) in board.next:
+                plane[(y + 1) * stride + x + width + 2] = index
+
+        return plane
+
+    try:
+        for move in board.run(player, adversary):
+            yield screen()
+    except (BlockLimitException, UnknownInstructionException):
+        pass
+    yield screen()
+
+
+class Renderer:
+    """
+    Draws screens of shape indices into an RGB image, repainting only the
+    cells that changed since the previous screen.
+    """
+
+    width = None
+    height = None
+    board_width = None
+    cell = None
+
+    def __init__(self, width, height, board_width, cell=CELL_SIZE):
+        self.width = width
+        self.height = height
+        self.board_width = board_width
+        self.cell = cell
+
+        self.palette = [bytes(BACKGROUND) * cell] + [
+            bytes(COLOR_VALUES[shape_to_color[shape]]) * cell
+            for shape in index_to_shape[1:]
+        ]
+        self.plane = bytearray(width * height)
+        self.rows = [
+            bytearray(bytes(BACKGROUND) * width * cell)
+            for _ in range(height * cell)
+        ]
+
+        # The line between the board and the preview of the next block.
+        x = (board_width * cell + 1) * 3
+        for row in self.rows:
+            row[x:x + 3] = bytes(SEPARATOR)
+
+    @property
+    def pixel_width(self):
+        return self.width * self.cell
+
+    @property
+    def pixel_height(self):
+        return self.height * self.cell
+
+    def draw(self, plane):
+        """
+        Brings the image up to date with a screen. Returns the changed area
+        as (left, top, right, bottom) in cells, exclusive of right and
+        bottom, or None if nothing changed.
+        """
+
+        width = self.width
+        cell = self.cell
+        separator = self.board_width * cell + 1
+
+        changed = None
+        for i, (old, new) in enumerate(zip(self.plane, plane)):
+            if old == new:
+                continue
+
+            x, y = i % width, i // width
+            color = self.palette[new]
+            for row in self.rows[y * cell:(y + 1) * cell]:
+                row[x * cell * 3:(x + 1) * cell * 3] = color
+                if x * cell <= separator < (x + 1) * cell:
+                    row[separator * 3:separator * 3 + 3] = bytes(SEPARATOR)
+
+            if changed is None:
+                changed = [x, y, x + 1, y + 1]
+            else:
+                changed[0] = min(changed[0], x)
+                changed[1] = min(changed[1], y)
+                changed[2] = max(changed[2], x + 1)
+                changed[3] = max(changed[3], y + 1)
+
+        self.plane[:] = plane
+        return changed
+
+    def image_data(self, area=None, level=6):
+        """
+        Compresses the image, or the given area of cells of it, as PNG image
+        data.
+        """
+
+        if area is None:
+            area = (0, 0, self.width, self.height)
+        left, top, right, bottom = (value * self.cell for value in area)
+
+        # Every row starts with filter type zero (none).
+        raw = b''.join(
+            b'\x00' + row[left * 3:right * 3]
+            for row in self.rows[top:bottom]
+        )
+        return zlib.compress(raw, level)
+
+    def header(self, width, height):
+        # Eight bits per channel, RGB.
+        return chunk(
+            b'IHDR',
+            struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+        )
+
+    def png(self, level=6):
+        """
+        Encodes the image as a PNG file.
+        """
+
+        return b''.join([
+            PNG_SIGNATURE,
+            self.header(self.pixel_width, self.pixel_height),
+            chunk(b'IDAT', self.image_data(level=level)),
+            chunk(b'IEND', b''),
+        ])
+
+
+class AnimationWriter:
+    """
+    Collects the screens of a game as an animated PNG. Only the area that
+    changed is stored for every frame, drawn over the previous one, and
+    screens that did not change extend how long the previous frame shows.
+    """
+
+    renderer = None
+    delay = None
+    level = None
+
+    def __init__(self, renderer, delay=50, level=6):
+        self.renderer = renderer
+        # Milliseconds every screen shows for.
+        self.delay = delay
+        self.level = level
+        # Frames as [area, image data, number of screens].
+        self.frames = []
+
+    def add(self, plane):
+        area = self.renderer.draw(plane)
+        if not self.frames:
+            area = (0, 0, self.renderer.width, self.renderer.height)
+        elif area is None:
+            self.frames[-1][2] += 1
+            return
+
+        self.frames.append([
+            area,
+            self.renderer.image_data(area, self.level),
+            1
+        ])
+
+    def encode(self):
+        """
+        Encodes the animation collected so far as an APNG file.
+        """
+
+        renderer = self.renderer
+        cell = renderer.cell
+        parts = [
+            PNG_SIGNATURE,
+            renderer.header(renderer.pixel_width, renderer.pixel_height),
+            chunk(b'acTL', struct.pack('>II', len(self.frames), 0)),
+        ]
+
+        sequence = 0
+        for number, (area, data, screens) in enumerate(self.frames):
+            left, top, right, bottom = area
+            # Leave the frame in place and draw the next over it, replacing
+            # the pixels in its area.
+            parts.append(chunk(b'fcTL', struct.pack(
+                '>IIIIIHHBB',
+                sequence,
+                (right - left) * cell,
+                (bottom - top) * cell,
+                left * cell,
+                top * cell,
+                screens * self.delay,
+                1000,
+                0,
+                0
+            )))
+            sequence += 1
+
+            if number == 0:
+                parts.append(chunk(b'IDAT', data))
+            else:
+                parts.append(chunk(b'fdAT', struct.pack('>I', sequence) + data))
+                sequence += 1
+
+        parts.append(chunk(b'IEND', b''))
+        return b''.join(parts)
+
+
+def render_game(game, directory, adversary, blocks, width, height, cell,
+                delay, still):
+    """
+    Renders one game into the directory, as an animated PNG or, if still is
+    set, as one PNG per move. The game is either a seed the selected player
+    plays against the adversary, or the path of a transcript to replay.
+    Returns the number of screens rendered.
+    """
+
+    board = Board(width, height)
+    if isinstance(game, int):
+        name = f'game-{game}'
+        moves = frames(
+            board,
+            SelectedPlayer(),
+            adversaries[adversary](game, blocks)
+        )
+    else:
+        name = os.path.splitext(os.path.basename(game))[0]
+        with open(game) as file:
+            shapes, actions = read_transcript(file)
+        moves = frames(
+            board,
+            TranscriptPlayer(actions),
+            TranscriptAdversary(shapes)
+        )
+
+    renderer = Renderer(width + PREVIEW_WIDTH, height, width, cell)
+    animation = AnimationWriter(renderer, delay)
+
+    count = 0
+    for plane in moves:
+        if still:
+            renderer.draw(plane)
+            path = os.path.join(directory, f'{name}-{count:05}.png')
+            with open(path, 'wb') as file:
+                file.write(renderer.png())
+        else:
+            animation.add(plane)
+        count += 1
+
+    if not still:
+        with open(os.path.join(directory, f'{name}.png'), 'wb') as file:
+            file.write(animation.encode())
+
+    return count
+
+
+parser = argparse.ArgumentParser(
+    description='Render games to animated PNGs, or PNG frames, without a '
+                'display'
+)
+parser.add_argument('directory')
+parser.add_argument(
+    'transcripts',
+    nargs='*',
+    help='Wire protocol transcripts of games to replay, instead of playing '
+         'games from seeds'
+)
+parser.add_argument('--games', default=1, type=int)
+parser.add_argument('--seed', default=DEFAULT_SEED, type=int)
+parser.add_argument('--blocks', default=BLOCK_LIMIT, type=int)
+parser.add_argument('--width', default=BOARD_WIDTH, type=int)
+parser.add_argument('--height', default=BOARD_HEIGHT, type=int)
+parser.add_argument(
+    '--adversary',
+    default='random',
+    choices=sorted(adversaries)
+)
+parser.add_argument(
+    '--cell',
+    default=CELL_SIZE,
+    type=int,
+    help='Pixels per cell'
+)
+parser.add_argument(
+    '--delay',
+    default=50,
+    type=int,
+    help='Milliseconds every move shows for'
+)
+parser.add_argument(
+    '--frames',
+    default=False,
+    action='store_true',
+    help='Write one PNG per move instead of an animated PNG per game'
+)
+parser.add_argument(
+    '--workers',
+    default=None,
+    type=int,
+    help='Processes to render games in'
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_intermixed_args()
+    os.makedirs(args.directory, exist_ok=True)
+
+    games = args.transcripts or range(args.seed, args.seed + args.games)
+
+    start = time.monotonic()
+    with ProcessPoolExecutor(args.workers) as executor:
+        futures = {
+            executor.submit(
+                render_game,
+                game,
+                args.directory,
+                args.adversary,
+                args.blocks,
+                args.width,
+                args.height,
+                args.cell,
+                args.delay,
+                args.frames
+            ): game
+            for game in games
+        }
+
+        screens = 0
+        for future in as_completed(futures):
+            count = future.result()
+            screens += count
+            print(f'{futures[future]}: {count} moves', flush=True)
+
+    elapsed = time.monotonic() - start
+    print(
+        f'{screens} moves in {elapsed:.1f}s ({screens / elapsed:.0f}/s, '
+        f'{screens * args.delay / 1000 / elapsed:.0f}x real time)'
+    )
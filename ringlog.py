@@ -0,0 +1,79 @@
+from collections import deque
+from constants import LOG_CAPACITY
+from time import monotonic
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+LEVELS = {
+    'debug': DEBUG,
+    'info': INFO,
+    'warning': WARNING,
+    'error': ERROR,
+    'off': OFF,
+}
+LEVEL_NAMES = {level: name.upper() for name, level in LEVELS.items()}
+
+
+class RingLog:
+    """
+    Keeps the most recent log records in memory, to be written out when
+    asked for (such as when a game ends) rather than as they happen.
+
+    Records below the level are dropped straight away, and records that are
+    kept are only formatted when written out, so logging from the hot path
+    costs little more than a comparison when disabled.
+    """
+
+    level = None
+    records = None
+
+    def __init__(self, capacity=LOG_CAPACITY, level=WARNING):
+        self.level = level
+        self.records = deque(maxlen=capacity)
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, message, *args):
+        """
+        Keeps a record, with the message formatted by % with the arguments
+        once it is written out.
+        """
+
+        if level >= self.level:
+            self.records.append((monotonic(), level, message, args))
+
+    def debug(self, message, *args):
+        if DEBUG >= self.level:
+            self.records.append((monotonic(), DEBUG, message, args))
+
+    def info(self, message, *args):
+        if INFO >= self.level:
+            self.records.append((monotonic(), INFO, message, args))
+
+    def warning(self, message, *args):
+        self.log(WARNING, message, *args)
+
+    def error(self, message, *args):
+        self.log(ERROR, message, *args)
+
+    def dump(self, stream):
+        """
+        Writes out the records kept so far, oldest first, and forgets them.
+        """
+
+        while self.records:
+            time, level, message, args = self.records.popleft()
+            if args:
+                message = message % args
+            stream.write(f'{time:.6f} {LEVEL_NAMES[level]} {message}\n')
+        stream.flush()
+
+
+# The log of this process.
+log = RingLog()
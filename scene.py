@@ -0,0 +1,107 @@
+from board import Block, shape_to_color
+from events import (
+    BlockChosen,
+    BlockLanded,
+    BlockMoved,
+    BlockRotated,
+    BlockSpawned,
+    LinesCleared,
+    ScoreChanged,
+)
+
+
+class Frame:
+    """
+    Everything there is to draw of a game at one moment: the colors of the
+    cells on the board by position, the color and cells of the falling
+    block and the next block (None if there is none), and the score.
+    """
+
+    landed = None
+    falling = None
+    next = None
+    score = None
+
+    def __init__(self, landed, falling, next, score):
+        self.landed = landed
+        self.falling = falling
+        self.next = next
+        self.score = score
+
+
+class Scene:
+    """
+    Follows a board through its events to keep a frame of what renderers
+    draw, so they neither read the board nor hold its lock while the game
+    goes on. Frames are never changed, only replaced, so a renderer on
+    another thread always gets a whole one from the frame attribute.
+    """
+
+    width = None
+    height = None
+    frame = None
+
+    # Rows cleared by the block that is landing, which the landing event
+    # reports after them.
+    cleared = None
+
+    def __init__(self, board):
+        self.width = board.width
+        self.height = board.height
+
+        landed = {
+            (x, y): shape_to_color[board.shape_at(x, y)] for (x, y) in board
+        }
+        falling = None
+        if board.falling is not None:
+            falling = board.falling.color, board.falling.cells
+        next = None
+        if board.next is not None:
+            next = board.next.color, board.next.cells
+        self.frame = Frame(landed, falling, next, board.score)
+
+        board.subscribe(self)
+
+    def __call__(self, event):
+        frame = self.frame
+        landed, falling, next, score = (
+            frame.landed, frame.falling, frame.next, frame.score
+        )
+
+        if isinstance(event, BlockChosen):
+            block = Block(event.shape)
+            next = block.color, block.cells
+        elif isinstance(event, BlockSpawned):
+            falling = shape_to_color[event.shape], event.cells
+            next = None
+        elif isinstance(event, (BlockMoved, BlockRotated)):
+            falling = falling[0], event.cells
+        elif isinstance(event, LinesCleared):
+            self.cleared = event.rows
+            return
+        elif isinstance(event, BlockLanded):
+            landed = dict(landed)
+            for cell in event.cells:
+                landed[cell] = shape_to_color[event.shape]
+            if self.cleared:
+                landed = remove_rows(landed, self.cleared)
+                self.cleared = None
+            falling = None
+        elif isinstance(event, ScoreChanged):
+            score = event.score
+        else:
+            return
+
+        self.frame = Frame(landed, falling, next, score)
+
+
+def remove_rows(landed, rows):
+    """
+    Removes the given rows from the cells, moving the cells above them down.
+    """
+
+    moved = {}
+    for (x, y), color in landed.items():
+        if y not in rows:
+            moved[(x, y + sum(1 for row in rows if row > y))] = color
+    return moved
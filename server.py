@@ -1,12 +1,29 @@
 from adversary import Adversary
-from board import Board, Direction, Rotation, Shape
+from arguments import parser, player_options
+from board import Board, Shape
 from constants import BOARD_HEIGHT, BOARD_WIDTH, PREFIX
-from exceptions import UnknownInstructionException
+from decision_cache import open_cache
+from events import ActionTaken
+from exceptions import UnknownInstructionException, GameOverException
 from player import SelectedPlayer
+from ringlog import LEVELS, log
+
+from os import getenv
+from sys import stderr
+
+import signal
 
 
 class RemoteAdversary(Adversary):
-    def choose_block(self, board):
+    persistent = None
+    player = None
+
+    def __init__(self, persistent=False, player=None):
+        self.persistent = persistent
+        # If given, the player gets to ponder while we wait for a shape.
+        self.player = player
+
+    def read_command(self):
         while True:
             try:
                 command = input().strip()
@@ -14,11 +31,33 @@ class RemoteAdversary(Adversary):
                 raise SystemExit
 
             if command.startswith(PREFIX):
-                break
+                return command[len(PREFIX)+1:]
 
-        command = command[len(PREFIX)+1:]
+    def wait_for_result(self):
+        """
+        Skips ahead to the end of the current game, as announced by the
+        other side. Used when we noticed the game was lost before being
+        told so.
+        """
+
+        while self.read_command() not in ('WON', 'LOST'):
+            pass
+
+    def choose_block(self, board):
+        if self.player is not None:
+            self.player.ponder(board)
+            try:
+                command = self.read_command()
+            finally:
+                self.player.stop_pondering()
+        else:
+            command = self.read_command()
 
         if command == 'WON' or command == 'LOST':
+            if self.persistent:
+                # Game ended; get ready for the next one.
+                raise GameOverException
+
             # Game ended; stop cleanly.
             raise SystemExit
 
@@ -30,15 +69,50 @@ class RemoteAdversary(Adversary):
         raise UnknownInstructionException
 
 
-board = Board(BOARD_WIDTH, BOARD_HEIGHT)
+def send(event):
+    if isinstance(event, ActionTaken):
+        action = event.action
+        print(f'{PREFIX} {"SKIP" if action is None else action.value}')
+
+
+def play(board, player, adversary):
+    board.subscribe(send)
+    try:
+        for _ in board.run(player, adversary):
+            pass
+    finally:
+        # Stdout only carries the protocol; the log goes to stderr.
+        log.dump(stderr)
+
+
+args = parser.parse_args()
+log.level = LEVELS[args.log_level]
+if hasattr(signal, 'SIGUSR1'):
+    signal.signal(signal.SIGUSR1, lambda signum, frame: log.dump(stderr))
+cache = open_cache(getenv('DECISION_CACHE'))
+
+if args.persistent:
+    # Keep the process (and everything it has imported) around, and start
+    # over with a fresh board and player every time a game ends.
+    adversary = RemoteAdversary(persistent=True)
+
+    while True:
+        board = Board(BOARD_WIDTH, BOARD_HEIGHT)
+        player = SelectedPlayer(cache=cache, **player_options(args))
+        if args.ponder:
+            adversary.player = player
+
+        try:
+            play(board, player, adversary)
+        except GameOverException:
+            continue
+
+        # We ran out of space; the other side still has to announce that.
+        adversary.wait_for_result()
+else:
+    board = Board(BOARD_WIDTH, BOARD_HEIGHT)
 
-player = SelectedPlayer()
-adversary = RemoteAdversary()
+    player = SelectedPlayer(cache=cache, **player_options(args))
+    adversary = RemoteAdversary(player=player if args.ponder else None)
 
-for move in board.run(player, adversary):
-    if isinstance(move, Direction):
-        print(f'{PREFIX} {move.value}')
-    elif isinstance(move, Rotation):
-        print(f'{PREFIX} {move.value}')
-    elif move is None:
-        print(f'{PREFIX} SKIP')
+    play(board, player, adversary)
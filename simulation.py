@@ -0,0 +1,55 @@
+from exceptions import BlockLimitException
+from threading import Thread
+from time import monotonic, sleep
+
+
+class Simulation(Thread):
+    """
+    Runs a game on a background thread, independently of any renderer. The
+    game advances as fast as the player allows, or at most rate moves per
+    second if a rate is given. Renderers draw the latest frame of a
+    scene.Scene at their own pace, so frames are simply dropped when the
+    simulation outruns the display.
+    """
+
+    board = None
+    player = None
+    adversary = None
+    rate = None
+
+    moves = 0
+    error = None
+
+    def __init__(self, board, player, adversary, rate=None):
+        super().__init__()
+        self.daemon = True
+
+        self.board = board
+        self.player = player
+        self.adversary = adversary
+        self.rate = rate
+
+    def run(self):
+        interval = 1 / self.rate if self.rate else 0
+        deadline = monotonic()
+
+        try:
+            for move in self.board.run(self.player, self.adversary):
+                self.moves += 1
+
+                if interval:
+                    # Keep a fixed schedule so slow moves are caught up on.
+                    deadline += interval
+                    delay = deadline - monotonic()
+                    if delay > 0:
+                        sleep(delay)
+        except BlockLimitException:
+            # The adversary ran out of blocks; the game is simply over.
+            pass
+        except Exception as e:
+            # Hand the error to the thread that is rendering the game.
+            self.error = e
+
+    @property
+    def finished(self):
+        return not self.is_alive()
@@ -0,0 +1,154 @@
+from board import (
+    Block,
+    Board,
+    index_to_shape,
+    shape_rotations,
+    shape_to_index
+)
+
+import struct
+
+
+# Header: magic, version, flags, board width and height, score, shape of the
+# falling block (zero if none), its orientation and top left corner, and the
+# shape of the next block (zero if none).
+HEADER = struct.Struct('<4sBBHHqBbhhB')
+MAGIC = b'TTSN'
+VERSION = 1
+
+# Set in the flags when the state of an adversary follows the board.
+HAS_ADVERSARY = 1
+
+# Adversary: blocks left (-1 for no limit), whether a Gaussian value is
+# pending and its value, then the state of the Mersenne Twister.
+ADVERSARY = struct.Struct('<qBd')
+TWISTER = struct.Struct('<625I')
+
+# The version of random.Random.getstate the twister state is taken from.
+TWISTER_VERSION = 3
+
+
+def row_bytes(width):
+    return (width + 7) // 8
+
+
+def encode(board, adversary=None):
+    """
+    Encodes a board, and optionally the random number generator and block
+    limit of its adversary, as bytes.
+
+    The encoding is a header followed by every row as a little endian
+    bitmask of occupied cells, the color plane of the board, and the state
+    of the adversary if there is one.
+    """
+
+    width = board.width
+    height = board.height
+    size = row_bytes(width)
+
+    falling = 0
+    rotation = x = y = 0
+    if board.falling is not None:
+        falling = shape_to_index[board.falling.shape]
+        block = board.falling
+        rotation, x, y = block.rotation, block.x, block.y
+
+    next = 0
+    if board.next is not None:
+        next = shape_to_index[board.next.shape]
+
+    flags = HAS_ADVERSARY if adversary is not None else 0
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        flags,
+        width,
+        height,
+        board.score,
+        falling,
+        rotation,
+        x,
+        y,
+        next
+    )
+
+    parts = [header]
+    parts += [row.to_bytes(size, 'little') for row in board.row_masks()]
+    parts.append(bytes(board.colors))
+
+    if adversary is not None:
+        version, twister, gauss = adversary.random.getstate()
+        blocks = adversary.blocks
+        parts.append(ADVERSARY.pack(
+            -1 if blocks is None else blocks,
+            gauss is not None,
+            gauss or 0
+        ))
+        parts.append(TWISTER.pack(*twister))
+
+    return b''.join(parts)
+
+
+def decode(data, adversary=None):
+    """
+    Decodes a board from bytes or any other buffer. If given, the adversary
+    has its random number generator and block limit restored as well.
+
+    The color plane of the board is a read-only view of the buffer, shared
+    like that of a cloned board, so it is only copied once it changes.
+    """
+
+    view = memoryview(data)
+    (
+        magic,
+        version,
+        flags,
+        width,
+        height,
+        score,
+        falling,
+        rotation,
+        x,
+        y,
+        next
+    ) = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Not a board snapshot')
+
+    board = Board(width, height, score)
+
+    size = row_bytes(width)
+    offset = HEADER.size
+    masks = []
+    for row in range(height):
+        masks.append(int.from_bytes(view[offset:offset + size], 'little'))
+        offset += size
+    board.masks = tuple(masks)
+
+    board.colors = view[offset:offset + width * height].toreadonly()
+    board.colors_shared = True
+    offset += width * height
+
+    if falling:
+        shape = index_to_shape[falling]
+        orientation = shape_rotations(shape)[0][rotation]
+        block = Block(shape)
+        block.set_position(rotation, x, y)
+        block.center = x - orientation.corner[0], y - orientation.corner[1]
+        board.falling = block
+
+    if next:
+        board.next = Block(index_to_shape[next])
+
+    if adversary is not None:
+        if not flags & HAS_ADVERSARY:
+            raise ValueError('Snapshot holds no adversary')
+
+        blocks, has_gauss, gauss = ADVERSARY.unpack_from(view, offset)
+        twister = TWISTER.unpack_from(view, offset + ADVERSARY.size)
+        adversary.random.setstate(
+            (TWISTER_VERSION, twister, gauss if has_gauss else None)
+        )
+        adversary.blocks = None if blocks < 0 else blocks
+
+    return board
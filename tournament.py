@@ -0,0 +1,224 @@
+from adversary import adversaries
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from constants import DEFAULT_SEED
+from metrics import Metrics, serve
+from subprocess import DEVNULL, PIPE, Popen
+from threading import Timer
+
+import argparse
+import json
+import os
+import sys
+import time
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds between the metrics updates of a referee, when they are merged.
+METRICS_UPDATES = 1
+
+
+class Match:
+    """
+    The outcome of one game between client.py, which referees, and
+    server.py, which plays, as reported by the referee.
+    """
+
+    seed = None
+    score = None
+    result = None
+    elapsed = None
+    messages = None
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.score = 0
+        self.messages = 0
+
+    def parse(self, line):
+        """
+        Reads a line the referee writes to stderr: a score update, the
+        result, the metrics summary or an update of the metrics themselves.
+        Returns the metrics update, if it was one.
+        """
+
+        line = line.strip()
+        if line.isdigit():
+            self.score = int(line)
+        elif line in ('WON', 'LOST'):
+            self.result = line
+        elif line.startswith('STATS '):
+            for field in line.split()[1:]:
+                name, _, value = field.partition('=')
+                if name == 'messages':
+                    self.messages = int(value)
+        elif line.startswith('METRICS '):
+            return json.loads(line[len('METRICS '):])
+        return None
+
+    @property
+    def throughput(self):
+        """
+        Protocol messages per second, in both directions.
+        """
+
+        return self.messages / self.elapsed if self.elapsed else 0
+
+
+def play_match(seed, adversary, bot_args, timeout, metrics=None):
+    """
+    Plays one game over the real protocol, with the output of each process
+    piped straight into the other. The metrics of the referee are merged
+    into the given metrics, if any, as its updates come in.
+    """
+
+    env = dict(
+        os.environ,
+        SEED=str(seed),
+        ADVERSARY=adversary,
+        METRICS_SUMMARY='1'
+    )
+    if metrics is not None:
+        env['METRICS_UPDATES'] = str(METRICS_UPDATES)
+    # Referees would all fight over the same port; the metrics are served
+    # from here instead.
+    env.pop('METRICS_PORT', None)
+    bot_in, referee_out = os.pipe()
+    referee_in, bot_out = os.pipe()
+
+    match = Match(seed)
+    if metrics is not None:
+        metrics.game_started()
+    start = time.monotonic()
+    referee = Popen(
+        [sys.executable, os.path.join(HERE, 'client.py')],
+        stdin=referee_in,
+        stdout=referee_out,
+        stderr=PIPE,
+        env=env,
+        cwd=HERE,
+        universal_newlines=True
+    )
+    bot = Popen(
+        [sys.executable, os.path.join(HERE, 'server.py'), *bot_args],
+        stdin=bot_in,
+        stdout=bot_out,
+        stderr=DEVNULL,
+        env=env,
+        cwd=HERE
+    )
+
+    # The children hold their own copies now; keeping ours open would stop
+    # either side from noticing when the other goes away.
+    for fd in (bot_in, referee_out, referee_in, bot_out):
+        os.close(fd)
+
+    def abandon():
+        referee.kill()
+        bot.kill()
+
+    timer = None
+    if timeout is not None:
+        timer = Timer(timeout, abandon)
+        timer.start()
+
+    # Read as the referee writes, so its metrics are merged while it plays.
+    for line in referee.stderr:
+        update = match.parse(line)
+        if update is not None and metrics is not None:
+            metrics.merge(update)
+    referee.wait()
+    bot.wait()
+    if timer is not None:
+        timer.cancel()
+    match.elapsed = time.monotonic() - start
+
+    if match.result is None:
+        match.result = 'TIMEOUT' if referee.returncode < 0 else 'ERROR'
+
+    if metrics is not None:
+        metrics.game_stopped()
+    return match
+
+
+parser = argparse.ArgumentParser(
+    description='Play client.py against server.py over pipes, many times'
+)
+parser.add_argument('--matches', default=8, type=int)
+parser.add_argument('--seed', default=DEFAULT_SEED, type=int)
+parser.add_argument(
+    '--workers',
+    default=os.cpu_count(),
+    type=int,
+    help='Matches to play at the same time'
+)
+parser.add_argument(
+    '--adversary',
+    default='random',
+    choices=sorted(adversaries)
+)
+parser.add_argument(
+    '--timeout',
+    default=None,
+    type=float,
+    help='Seconds after which a match is abandoned'
+)
+parser.add_argument(
+    '--metrics-port',
+    default=None,
+    type=int,
+    help='Port to serve the metrics of all matches on, merged, while they '
+         'are played'
+)
+parser.add_argument(
+    'bot_args',
+    nargs=argparse.REMAINDER,
+    help='Arguments for server.py, after --'
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    bot_args = args.bot_args
+    if bot_args[:1] == ['--']:
+        bot_args = bot_args[1:]
+
+    metrics = None
+    if args.metrics_port is not None:
+        metrics = Metrics()
+        serve(metrics, args.metrics_port)
+
+    start = time.monotonic()
+    matches = []
+    with ThreadPoolExecutor(args.workers) as executor:
+        futures = [
+            executor.submit(
+                play_match,
+                seed,
+                args.adversary,
+                bot_args,
+                args.timeout,
+                metrics
+            )
+            for seed in range(args.seed, args.seed + args.matches)
+        ]
+
+        for future in as_completed(futures):
+            match = future.result()
+            matches.append(match)
+            print(
+                f'seed {match.seed}: {match.score} {match.result} in '
+                f'{match.elapsed:.1f}s, {match.messages} messages '
+                f'({match.throughput:.0f}/s)',
+                flush=True
+            )
+
+    elapsed = time.monotonic() - start
+    won = sum(match.result == 'WON' for match in matches)
+    scores = [match.score for match in matches]
+    messages = sum(match.messages for match in matches)
+    print(
+        f'{len(matches)} matches, {won} won, mean score '
+        f'{sum(scores) / len(scores):.0f} in {elapsed:.1f}s, '
+        f'{messages / elapsed:.0f} messages/s'
+    )
@@ -1,8 +1,10 @@
-from adversary import RandomAdversary
-from arguments import parser
+from adversary import adversaries
+from arguments import parser, player_options
 from board import Board, Direction, Rotation
 from constants import BOARD_WIDTH, BOARD_HEIGHT, DEFAULT_SEED, INTERVAL
 from player import Player, SelectedPlayer
+from scene import Scene
+from simulation import Simulation
 
 import pygame
 
@@ -31,26 +33,29 @@ class Square(pygame.sprite.Sprite):
         self.rect.y = y * CELL_HEIGHT
 
 
-def render(screen, board):
+def render(screen, scene):
+    frame = scene.frame
     screen.fill(BLACK)
 
     sprites = pygame.sprite.Group()
 
     # Add the cells already on the board for drawing.
-    for (x, y) in board:
-        sprites.add(Square(pygame.Color(board.cellcolor[x, y]), x, y))
+    for (x, y), color in frame.landed.items():
+        sprites.add(Square(pygame.Color(color), x, y))
 
-    if board.falling is not None:
+    if frame.falling is not None:
         # Add the cells of the falling block for drawing.
-        for (x, y) in board.falling:
-            sprites.add(Square(pygame.Color(board.falling.color), x, y))
+        color, cells = frame.falling
+        for (x, y) in cells:
+            sprites.add(Square(pygame.Color(color), x, y))
 
-    if board.next is not None:
-        for (x, y) in board.next:
+    if frame.next is not None:
+        color, cells = frame.next
+        for (x, y) in cells:
             sprites.add(
                 Square(
-                    pygame.Color(board.next.color),
-                    x + board.width + 2,
+                    pygame.Color(color),
+                    x + scene.width + 2,
                     y+1
                 )
             )
@@ -60,12 +65,12 @@ def render(screen, board):
     pygame.draw.line(
         screen,
         BLUE,
-        (board.width * CELL_WIDTH + 2, 0),
-        (board.width * CELL_WIDTH + 2, board.height * CELL_HEIGHT)
+        (scene.width * CELL_WIDTH + 2, 0),
+        (scene.width * CELL_WIDTH + 2, scene.height * CELL_HEIGHT)
     )
 
     # Update window title with score.
-    pygame.display.set_caption(f'Score: {board.score}')
+    pygame.display.set_caption(f'Score: {frame.score}')
 
 
 class UserPlayer(Player):
@@ -107,13 +112,13 @@ def check_stop():
 
 def run():
     board = Board(BOARD_WIDTH, BOARD_HEIGHT)
-    adversary = RandomAdversary(DEFAULT_SEED)
 
     args = parser.parse_args()
+    adversary = adversaries[args.adversary](DEFAULT_SEED)
     if args.manual:
         player = UserPlayer()
     else:
-        player = SelectedPlayer()
+        player = SelectedPlayer(**player_options(args))
 
     pygame.init()
 
@@ -127,15 +132,34 @@ def run():
     # Set timer to force block down when no input is given.
     pygame.time.set_timer(EVENT_FORCE_DOWN, INTERVAL)
 
-    for move in board.run(player, adversary):
-        render(screen, board)
-        pygame.display.flip()
+    scene = Scene(board)
+    if args.turbo and not args.manual:
+        # Play on a background thread and only draw whatever the latest
+        # state is once per frame.
+        simulation = Simulation(board, player, adversary, args.rate)
+        simulation.start()
 
-        # If we are not playing manually, clear the events.
-        if not args.manual:
+        while not simulation.finished:
+            render(screen, scene)
+            pygame.display.flip()
             check_stop()
+            clock.tick(args.fps)
+
+        if simulation.error is not None:
+            raise simulation.error
+
+        render(screen, scene)
+        pygame.display.flip()
+    else:
+        for _ in board.run(player, adversary):
+            render(screen, scene)
+            pygame.display.flip()
+
+            # If we are not playing manually, clear the events.
+            if not args.manual:
+                check_stop()
 
-        clock.tick(FRAMES_PER_SECOND)
+            clock.tick(FRAMES_PER_SECOND)
 
     while True:
         check_stop()
@@ -2,25 +2,29 @@ from threading import Condition, Thread
 from time import sleep
 from tkinter import Tk, Canvas, Frame, BOTH, TclError
 
-from adversary import RandomAdversary
-from arguments import parser
+from adversary import adversaries
+from arguments import parser, player_options
 from board import Board, Direction, Rotation
 from constants import BOARD_HEIGHT, BOARD_WIDTH, DEFAULT_SEED, INTERVAL
 from player import SelectedPlayer, Player
+from scene import Scene
+from simulation import Simulation
 
 DRAW_INTERVAL = 100
 
 
 class Visual(Frame):
-    board = None
+    scene = None
     canvas = None
+    interval = None
 
     CELL_SIZE = 20
 
-    def __init__(self, board):
+    def __init__(self, board, interval=DRAW_INTERVAL):
         super().__init__()
 
-        self.board = board
+        self.scene = Scene(board)
+        self.interval = interval
 
         self.master.geometry(
             f'{(BOARD_WIDTH+6)*self.CELL_SIZE}x' +
@@ -31,7 +35,7 @@ class Visual(Frame):
         self.canvas = Canvas(self)
         self.canvas.pack(fill=BOTH, expand=1)
 
-        self.after(DRAW_INTERVAL, self.draw)
+        self.after(self.interval, self.draw)
 
         self.focus_set()
         self.bind("<Escape>", self.quit)
@@ -50,31 +54,30 @@ class Visual(Frame):
         )
 
     def draw(self):
-        with self.board.lock:
-            self.canvas.delete('all')
+        scene = self.scene
+        frame = scene.frame
+        self.canvas.delete('all')
 
-            if self.board.falling is not None:
-                for (x, y) in self.board.falling:
-                    self.draw_cell(x, y, self.board.falling.color)
+        if frame.falling is not None:
+            color, cells = frame.falling
+            for (x, y) in cells:
+                self.draw_cell(x, y, color)
 
-            if self.board.next is not None:
-                for (x, y) in self.board.next:
-                    self.draw_cell(
-                        x + self.board.width + 2,
-                        y + 1,
-                        self.board.next.color
-                    )
+        if frame.next is not None:
+            color, cells = frame.next
+            for (x, y) in cells:
+                self.draw_cell(x + scene.width + 2, y + 1, color)
 
-            for (x, y) in self.board:
-                self.draw_cell(x, y, self.board.cellcolor[x, y])
+        for (x, y), color in frame.landed.items():
+            self.draw_cell(x, y, color)
 
-            x = self.board.width * self.CELL_SIZE + 1
-            y = self.board.height * self.CELL_SIZE
-            self.canvas.create_line(x, 0, x, y, fill='black')
+        x = scene.width * self.CELL_SIZE + 1
+        y = scene.height * self.CELL_SIZE
+        self.canvas.create_line(x, 0, x, y, fill='black')
 
-            self.master.title(f'Score: {self.board.score}')
+        self.master.title(f'Score: {frame.score}')
 
-            self.after(DRAW_INTERVAL, self.draw)
+        self.after(self.interval, self.draw)
 
 
 class UserPlayer(Player):
@@ -144,24 +147,30 @@ def run():
         pass
 
     args = parser.parse_args()
+    adversary = adversaries[args.adversary](DEFAULT_SEED)
     if args.manual:
         player = UserPlayer(root)
     else:
-        player = SelectedPlayer()
+        player = SelectedPlayer(**player_options(args))
 
-    adversary = RandomAdversary(DEFAULT_SEED)
     board = Board(BOARD_WIDTH, BOARD_HEIGHT)
 
     def runner():
-        for move in board.run(player, adversary):
+        for _ in board.run(player, adversary):
             # When not playing manually, allow some time to see the move.
             if not args.manual:
                 sleep(0.1)
 
-    Visual(board)
+    if args.turbo and not args.manual:
+        # The canvas already draws the scene on a timer; just let the game
+        # run on its own and redraw at the requested frame rate.
+        Visual(board, max(1, int(1000 / args.fps)))
+        background = Simulation(board, player, adversary, args.rate)
+    else:
+        Visual(board)
+        background = Thread(target=runner)
+        background.daemon = True
 
-    background = Thread(target=runner)
-    background.daemon = True
     background.start()
 
     root.mainloop()